@@ -13,6 +13,137 @@ MAX_CONTENT_LENGTH = 5 * 1024 * 1024  # 5 MB
 # Leave empty to rely on system PATH or set via env var TESSERACT_CMD
 TESSERACT_CMD = os.getenv('TESSERACT_CMD', '')
 
+# /detect runs OCR on OCR_WORKERS background processes. Uploads are rejected
+# while OCR_MAX_PENDING jobs are queued or running; the last OCR_JOB_HISTORY
+# finished jobs stay visible at /detect/<job_id>, whose status goes from
+# 'queued' to 'running' (handed to a worker) to 'done' or 'failed'.
+OCR_WORKERS = int(os.getenv('OCR_WORKERS', '2'))
+OCR_MAX_PENDING = int(os.getenv('OCR_MAX_PENDING', '16'))
+OCR_JOB_HISTORY = int(os.getenv('OCR_JOB_HISTORY', '1000'))
+
+# Images over OCR_MAX_PIXELS (width * height, read from the header before
+# decoding) are rejected. Uploads are OCR'd from memory; PERSIST_UPLOADS=0
+# skips writing them to UPLOAD_FOLDER (the post then has no image).
+OCR_MAX_PIXELS = int(os.getenv('OCR_MAX_PIXELS', str(40_000_000)))
+PERSIST_UPLOADS = os.getenv('PERSIST_UPLOADS', '1') == '1'
+
+# Tesseract language and extra command-line options used for /detect
+OCR_LANG = os.getenv('OCR_LANG', 'eng')
+OCR_TESSERACT_CONFIG = os.getenv('OCR_TESSERACT_CONFIG', '')
+
+# OCR engine: 'subprocess' (pytesseract, one tesseract process per image),
+# 'tesserocr' (libtesseract loaded once per worker; OCR_TESSDATA points at
+# the traineddata directory if it is not the default), 'fake' (always
+# returns OCR_FAKE_TEXT, for tests) or 'auto' (tesserocr if installed).
+OCR_BACKEND = os.getenv('OCR_BACKEND', 'auto')
+OCR_TESSDATA = os.getenv('OCR_TESSDATA', '')
+OCR_FAKE_TEXT = os.getenv('OCR_FAKE_TEXT', '')
+
+# Before OCR, images are scaled so their long side is within
+# [OCR_MIN_SIDE, OCR_MAX_SIDE] and cut down to the detected text regions:
+# OCR_TEXT_REGIONS='crop' (the area spanning all regions), 'stack' (only the
+# regions, stacked; fewer pixels but less faithful) or 'off'. Images whose
+# regions are missing or cover too little get OCR'd whole, never skipped.
+# In tools/bench_ocr_preprocess.py 'crop' keeps 95% of the full-image words,
+# more than OCR of the same image less a 1px border does (88%).
+OCR_TEXT_REGIONS = os.getenv('OCR_TEXT_REGIONS', 'crop')
+OCR_MIN_SIDE = int(os.getenv('OCR_MIN_SIDE', '0'))
+OCR_MAX_SIDE = int(os.getenv('OCR_MAX_SIDE', '2000'))
+
+# Recognized text keyed by a hash of the decoded pixels and the OCR settings,
+# so re-uploaded images skip Tesseract. Each OCR worker keeps OCR_CACHE_SIZE
+# entries in memory in front of the shared SQLite file, which is trimmed to
+# OCR_CACHE_DB_ENTRIES (set OCR_CACHE_DB='' to keep it memory-only).
+OCR_CACHE_SIZE = int(os.getenv('OCR_CACHE_SIZE', '256'))
+OCR_CACHE_DB = os.getenv('OCR_CACHE_DB', os.path.join(BASE_DIR, 'src', 'ocr_cache.db'))
+OCR_CACHE_DB_ENTRIES = int(os.getenv('OCR_CACHE_DB_ENTRIES', '50000'))
+
+# /image results keyed by a digest of the uploaded bytes and a checksum of
+# the fake-image graph, so repeated images skip the model. IMAGE_CACHE_SIZE
+# entries are kept in memory in front of a SQLite file trimmed to
+# IMAGE_CACHE_DB_ENTRIES (set IMAGE_CACHE_DB='' to keep it memory-only).
+IMAGE_CACHE_SIZE = int(os.getenv('IMAGE_CACHE_SIZE', '1000'))
+IMAGE_CACHE_DB = os.getenv('IMAGE_CACHE_DB', os.path.join(BASE_DIR, 'src', 'image_cache.db'))
+IMAGE_CACHE_DB_ENTRIES = int(os.getenv('IMAGE_CACHE_DB_ENTRIES', '50000'))
+
+# Near-duplicate reuse (src/image_hash.py): a perceptual hash of every
+# /detect and /image upload is kept in IMAGE_HASH_DB with its result. A
+# re-encoded or resized repost within OCR_HASH_DISTANCE bits of an earlier
+# image reuses its OCR text, and within IMAGE_HASH_DISTANCE bits its
+# fake/original result. A negative distance turns reuse off (and stops
+# indexing that kind of result); IMAGE_HASH_DB='' disables the index. The
+# oldest hashes are dropped beyond IMAGE_HASH_DB_ENTRIES rows.
+# OCR is kept strict because chat screenshots with different text can hash
+# only a few bits apart. Fake/original reuse is off by default: a
+# perceptual hash is built to ignore small edits, which are exactly what
+# the detector has to catch, so a lightly doctored copy would inherit its
+# original's result (in static/test two different photos, one of them
+# heavily filtered, are 6 bits apart). Only enable it (e.g. 2) for
+# traffic that is mostly unedited reposts.
+IMAGE_HASH_DB = os.getenv('IMAGE_HASH_DB', os.path.join(BASE_DIR, 'src', 'image_hash_cache.db'))
+IMAGE_HASH_DB_ENTRIES = int(os.getenv('IMAGE_HASH_DB_ENTRIES', '50000'))
+IMAGE_HASH_DISTANCE = int(os.getenv('IMAGE_HASH_DISTANCE', '-1'))
+OCR_HASH_DISTANCE = int(os.getenv('OCR_HASH_DISTANCE', '0'))
+
+# NLTK data is read from this directory first (populate it once with
+# tools/fetch_nltk_data.py). With NLTK_OFFLINE=1 nothing is downloaded at
+# startup; otherwise only missing resources are fetched.
+NLTK_DATA_DIR = os.getenv('NLTK_DATA_DIR', os.path.join(BASE_DIR, 'nltk_data'))
+NLTK_OFFLINE = os.getenv('NLTK_OFFLINE', '0') == '1'
+# Resources clean_text needs, as (download id, nltk.data path)
+NLTK_RESOURCES = [
+    ('stopwords', 'corpora/stopwords'),
+    ('punkt', 'tokenizers/punkt'),
+    ('punkt_tab', 'tokenizers/punkt_tab'),
+    ('wordnet', 'corpora/wordnet'),
+]
+
+# Load the text model at import instead of on the first request that needs it
+PRELOAD_TEXT_MODEL = os.getenv('PRELOAD_TEXT_MODEL', '0') == '1'
+
+# Text model backend: 'keras' loads the full TensorFlow model, 'numpy' serves
+# the weights exported to src/LSTM.npz by tools/export_numpy_model.py and
+# 'tflite' the src/LSTM.tflite artifact written by tools/export_tflite.py
+TEXT_MODEL_BACKEND = os.getenv('TEXT_MODEL_BACKEND', 'keras')
+
+# Optional length buckets, e.g. '8,16': posts are run for the shortest bucket
+# length that fits them instead of all 30 LSTM steps. This shifts scores a
+# little (see tools/bench_length_buckets.py), so it is off by default.
+TEXT_LENGTH_BUCKETS = [int(b) for b in os.getenv('TEXT_LENGTH_BUCKETS', '').split(',') if b.strip()]
+
+# Text model micro-batching: concurrent posts are scored together in one
+# predict call of at most TEXT_BATCH_MAX_SIZE rows, waiting at most
+# TEXT_BATCH_MAX_WAIT_MS for other requests to join the batch.
+TEXT_BATCH_MAX_SIZE = int(os.getenv('TEXT_BATCH_MAX_SIZE', '32'))
+TEXT_BATCH_MAX_WAIT_MS = float(os.getenv('TEXT_BATCH_MAX_WAIT_MS', '5'))
+
+# Text preprocessing: 'nltk' uses word_tokenize, 'regex' a compiled-regex
+# tokenizer that splits the same way on our posts. Lemma results for up to
+# LEMMA_CACHE_SIZE distinct words are memoized.
+TEXT_TOKENIZER = os.getenv('TEXT_TOKENIZER', 'nltk')
+LEMMA_CACHE_SIZE = int(os.getenv('LEMMA_CACHE_SIZE', '50000'))
+
+# Text score cache: an in-memory LRU of SCORE_CACHE_SIZE entries in front of
+# an optional SQLite file (set SCORE_CACHE_DB='' to keep it memory-only)
+SCORE_CACHE_SIZE = int(os.getenv('SCORE_CACHE_SIZE', '10000'))
+SCORE_CACHE_DB = os.getenv('SCORE_CACHE_DB', os.path.join(BASE_DIR, 'src', 'score_cache.db'))
+SCORE_CACHE_DB_ENTRIES = int(os.getenv('SCORE_CACHE_DB_ENTRIES', '200000'))
+
+# Translation of non-English posts: backend is 'googletrans' or 'identity'
+# (no-op stand-in). Each call is capped at TRANSLATION_TIMEOUT seconds; after
+# TRANSLATION_FAILURE_THRESHOLD consecutive failures translation is skipped
+# for TRANSLATION_COOLDOWN seconds. Posts recognized as English are not
+# translated. TRANSLATION_ROMANIZED decides the remaining posts written only in
+# ASCII letters (e.g. romanized Hindi): 'skip' keeps them as written,
+# 'translate' sends them to the backend. Install langdetect to recognize more
+# English posts than the stopword check does.
+TRANSLATION_BACKEND = os.getenv('TRANSLATION_BACKEND', 'googletrans')
+TRANSLATION_TIMEOUT = float(os.getenv('TRANSLATION_TIMEOUT', '2'))
+TRANSLATION_CACHE_SIZE = int(os.getenv('TRANSLATION_CACHE_SIZE', '1000'))
+TRANSLATION_FAILURE_THRESHOLD = int(os.getenv('TRANSLATION_FAILURE_THRESHOLD', '3'))
+TRANSLATION_COOLDOWN = float(os.getenv('TRANSLATION_COOLDOWN', '60'))
+TRANSLATION_ROMANIZED = os.getenv('TRANSLATION_ROMANIZED', 'skip')
+
 # Telepot bot token - set via environment variable for safety
 TELEPOT_TOKEN = os.getenv('TELEPOT_TOKEN', '')
 
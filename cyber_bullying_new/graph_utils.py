@@ -0,0 +1,46 @@
+"""GraphDef rewrites shared by label_image.py and retrain.py.
+
+Only TensorFlow is imported here, so retrain.py can use these without
+importing label_image, its OpenCV and PIL dependencies and its classifier
+globals.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import tensorflow.compat.v1 as tf
+
+BOTTLENECK_RESHAPE = "pool_3/_reshape"
+
+def allow_batches(graph_def, reshape_name=BOTTLENECK_RESHAPE):
+  """Let the Reshape op `reshape_name` take any batch instead of exactly 1.
+
+  The Inception v3 graph reshapes pool_3 to a hard-coded [1, 2048]; turning
+  the leading 1 into -1 lets a whole batch of images through one run. Only
+  a shape whose other dimensions are all known is changed, and if its const
+  feeds other ops too the reshape gets its own copy instead.
+
+  Returns:
+    True if the reshape was rewritten.
+  """
+  nodes = dict((n.name, n) for n in graph_def.node)
+  reshape = nodes.get(reshape_name)
+  if reshape is None or reshape.op != "Reshape" or len(reshape.input) < 2:
+    return False
+  shape = nodes.get(reshape.input[1].split(":")[0])
+  if shape is None or shape.op != "Const":
+    return False
+  value = tf.make_ndarray(shape.attr["value"].tensor)
+  if value.ndim != 1 or len(value) < 2 or value[0] != 1 or (value[1:] <= 0).any():
+    return False
+  value[0] = -1
+  consumers = sum(1 for n in graph_def.node for i in n.input
+                  if i.lstrip("^").split(":")[0] == shape.name)
+  if consumers > 1:
+    copy = graph_def.node.add()
+    copy.CopyFrom(shape)
+    copy.name = shape.name + "_any_batch"
+    reshape.input[1] = copy.name
+    shape = copy
+  shape.attr["value"].tensor.CopyFrom(tf.make_tensor_proto(value))
+  return True
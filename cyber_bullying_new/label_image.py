@@ -4,13 +4,28 @@ from __future__ import print_function
 
 
 import argparse
+import hashlib
+import io
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
+import cv2
 import numpy as np
-import tensorflow as tf
+import tensorflow.compat.v1 as tf
+from PIL import Image
+
+from graph_utils import allow_batches
+
 #tf.disable_v2_behavior()
 
+MODEL_FILE = "retrained_graph.pb"
+LABEL_FILE = "retrained_labels.txt"
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
 def load_graph(model_file):
   graph = tf.Graph()
   graph_def = tf.GraphDef() 
@@ -22,30 +37,89 @@ def load_graph(model_file):
 
   return graph
 
+def decode_bgr(image_bytes):
+  """(height, width, 3) uint8 BGR array from encoded image bytes.
+
+  OpenCV decodes JPEG, PNG and BMP; anything else it cannot read (GIF) goes
+  through Pillow, which gives the first frame. EXIF orientation is ignored,
+  as it is by tf.image.decode_*.
+  """
+  data = np.frombuffer(memoryview(image_bytes), dtype=np.uint8)
+  bgr = cv2.imdecode(data, cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
+  if bgr is not None:
+    return bgr
+  try:
+    with Image.open(io.BytesIO(image_bytes)) as image:
+      return np.asarray(image.convert("RGB"))[:, :, ::-1]
+  except Exception:
+    raise ValueError("could not decode image (unknown format or corrupt file)")
+
+def _sample_points(in_size, out_size):
+  """Source index pairs and weights of TF1 resize_bilinear along one axis.
+
+  The model was trained on tf.image.resize_bilinear without half-pixel
+  centres: output index i samples the input at i * in_size / out_size,
+  clamped at the last index. cv2.resize samples at pixel centres instead,
+  which shifts every output pixel by up to half a source pixel.
+  """
+  points = (np.arange(out_size, dtype=np.float32) *
+            np.float32(in_size / out_size))
+  low = np.floor(points).astype(np.intp)
+  return low, np.minimum(low + 1, in_size - 1), points - low
+
+def preprocess_image(image, out=None, input_height=299, input_width=299,
+                     input_mean=128, input_std=128):
+  """Decode, resize and normalize an image into RGB `out`.
+
+  `image` is encoded image bytes or an already decoded BGR array. `out` is
+  a (input_height, input_width, 3) float32 array, for example one row of a
+  batch; a new one is allocated if it is None. The resize samples and
+  interpolates like the training graph (see _sample_points);
+  tools/check_preprocessing.py compares the result with retrain.py's
+  add_jpeg_decoding.
+  """
+  if out is None:
+    out = np.empty((input_height, input_width, 3), dtype=np.float32)
+  if not isinstance(image, np.ndarray):
+    image = decode_bgr(image)
+  y0, y1, y_lerp = _sample_points(image.shape[0], input_height)
+  x0, x1, x_lerp = _sample_points(image.shape[1], input_width)
+  # Work on (rows, width * 3) views; the column indices also swap BGR to RGB
+  rgb = np.array([2, 1, 0])
+  rows = image.reshape(image.shape[0], -1)[np.concatenate([y0, y1])]
+  cols = np.take(rows, (x0[:, np.newaxis] * 3 + rgb).ravel(), axis=1)
+  cols = cols.astype(np.float32)
+  right = np.take(rows, (x1[:, np.newaxis] * 3 + rgb).ravel(), axis=1)
+  step = np.subtract(right, cols, dtype=np.float32)
+  step *= np.repeat(x_lerp, 3)
+  cols += step
+  top, bottom = cols[:input_height], cols[input_height:]
+  bottom -= top
+  bottom *= y_lerp[:, np.newaxis]
+  flat = out.reshape(input_height, -1)
+  np.add(top, bottom, out=flat)
+  flat -= np.float32(input_mean)
+  flat /= np.float32(input_std)
+  return out
+
+def preprocess_batch(images, out=None, input_height=299, input_width=299,
+                     input_mean=128, input_std=128):
+  """Fill out[i] with preprocess_image(images[i]); `out` is (N, h, w, 3)."""
+  if out is None:
+    out = np.empty((len(images), input_height, input_width, 3),
+                   dtype=np.float32)
+  for i, image_bytes in enumerate(images):
+    preprocess_image(image_bytes, out[i], input_height, input_width,
+                     input_mean, input_std)
+  return out
+
 def read_tensor_from_image_file(file_name, input_height=299, input_width=299,
 				input_mean=0, input_std=255):
-  input_name = "file_reader"
-  output_name = "normalized"
-  file_reader = tf.io.read_file(file_name, input_name)
-  if file_name.endswith(".png"):
-    image_reader = tf.image.decode_png(file_reader, channels = 3,
-                                       name='png_reader')
-  elif file_name.endswith(".gif"):
-    image_reader = tf.squeeze(tf.image.decode_gif(file_reader,
-                                                  name='gif_reader'))
-  elif file_name.endswith(".bmp"):
-    image_reader = tf.image.decode_bmp(file_reader, name='bmp_reader')
-  else:
-    image_reader = tf.image.decode_jpeg(file_reader, channels = 3,
-                                        name='jpeg_reader')
-  float_caster = tf.cast(image_reader, tf.float32)
-  dims_expander = tf.expand_dims(float_caster, 0);
-  resized = tf.image.resize(dims_expander, [input_height, input_width])
-  normalized = tf.divide(tf.subtract(resized, [input_mean]), [input_std])
-  sess = tf.Session()
-  result = sess.run(normalized)
-
-  return result
+  with open(file_name, "rb") as f:
+    result = preprocess_image(f.read(), None, input_height, input_width,
+                              input_mean, input_std)
+
+  return result[np.newaxis]
 
 def load_labels(label_file):
   label = []
@@ -58,10 +132,138 @@ def load_labels(label_file):
 
 
 
+class ImageClassifier(object):
+  """Fake-image classifier that keeps the retrained graph resident.
+
+  The graph and labels are loaded and one session is opened when the
+  object is created, so `classify()` costs one preprocess_image() and one
+  `sess.run`. `classify_files()` preprocesses on threads straight into a
+  reusable batch buffer and runs the model once per batch.
+  """
+
+  def __init__(self, model_file=MODEL_FILE, label_file=LABEL_FILE,
+               input_height=299, input_width=299, input_mean=128,
+               input_std=128, input_layer="Mul", output_layer="final_result"):
+    self.labels = load_labels(label_file)
+    self.input_height = input_height
+    self.input_width = input_width
+    self.input_mean = input_mean
+    self.input_std = input_std
+    with open(model_file, "rb") as f:
+      graph_bytes = f.read()
+    # Identifies the model and preprocessing, for caching results
+    checksum = hashlib.sha256(graph_bytes)
+    checksum.update(repr(("opencv-tf1-bilinear", self.labels, input_height,
+                          input_width, input_mean, input_std, input_layer,
+                          output_layer)).encode("utf-8"))
+    self.fingerprint = checksum.hexdigest()
+    graph_def = tf.GraphDef()
+    graph_def.ParseFromString(graph_bytes)
+    allow_batches(graph_def)
+
+    self.graph = tf.Graph()
+    with self.graph.as_default():
+      self.batch = tf.placeholder(
+          tf.float32, [None, input_height, input_width, 3], name="batch")
+      output, = tf.import_graph_def(graph_def,
+                                    input_map={input_layer: self.batch},
+                                    return_elements=[output_layer + ":0"],
+                                    name="import")
+      self.output = output
+    self.graph.finalize()
+    self.sess = tf.Session(graph=self.graph)
+
+  def classify(self, image):
+    """Return {label: probability} for encoded image bytes or a BGR array."""
+    return self.classify_batch(self.preprocess(image)[np.newaxis])[0]
+
+  def classify_file(self, file_name):
+    with open(file_name, "rb") as f:
+      return self.classify(f.read())
+
+  def preprocess(self, image, out=None):
+    """Decoded, resized and normalized (height, width, 3) float32 image."""
+    return preprocess_image(image, out, self.input_height,
+                            self.input_width, self.input_mean, self.input_std)
+
+  def new_batch(self, size):
+    return np.zeros((size, self.input_height, self.input_width, 3),
+                    dtype=np.float32)
+
+  def classify_batch(self, images):
+    """{label: probability} for each preprocessed image in `images`.
+
+    `images` is an (N, height, width, 3) array or a list of images.
+    """
+    if not isinstance(images, np.ndarray):
+      images = np.stack(images)
+    results = self.sess.run(self.output, {self.batch: images})
+    return [self._probabilities(r) for r in results]
+
+  def classify_files(self, file_names, batch_size=32, threads=4):
+    """Yield (file_name, {label: prob}, error) for each file, in order.
+
+    Files are read and preprocessed on `threads` threads into one of two
+    batch buffers while the model runs on the other. Every run sees the
+    full `batch_size` rows, so the input shape never changes. Files that
+    cannot be read or decoded are yielded with probabilities None and the
+    error message.
+    """
+    file_names = list(file_names)
+    buffers = [self.new_batch(batch_size), self.new_batch(batch_size)]
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+
+      def load_batch(start):
+        names = file_names[start:start + batch_size]
+        batch = buffers[(start // batch_size) % 2]
+        return names, batch, [pool.submit(self._load, name, batch[i])
+                              for i, name in enumerate(names)]
+
+      pending = load_batch(0) if file_names else None
+      for start in range(0, len(file_names), batch_size):
+        names, batch, futures = pending
+        errors = [future.result() for future in futures]
+        if start + batch_size < len(file_names):
+          pending = load_batch(start + batch_size)
+        # Rows of failed or missing files hold stale data; their results are dropped
+        results = self.classify_batch(batch) if None in errors else []
+        for i, (name, error) in enumerate(zip(names, errors)):
+          yield name, None if error else results[i], error
+
+  def close(self):
+    self.sess.close()
+
+  def _probabilities(self, results):
+    return dict((label, float(p)) for label, p in zip(self.labels, results))
+
+  def _load(self, file_name, out):
+    """Preprocess `file_name` into `out`; the error message, or None."""
+    try:
+      with open(file_name, "rb") as f:
+        self.preprocess(f.read(), out)
+      return None
+    except Exception as e:
+      return _error_reason(e)
+
+
+def _error_reason(e):
+  lines = str(e).strip().splitlines()
+  return lines[0] if lines else type(e).__name__
+
+
+def get_classifier():
+  """The shared classifier, created on first use."""
+  global _classifier
+  with _classifier_lock:
+    if _classifier is None:
+      _classifier = ImageClassifier()
+    return _classifier
+
+
 def main(img):
   file_name = img
-  model_file = "retrained_graph.pb"
-  label_file = "retrained_labels.txt"
+  model_file = MODEL_FILE
+  label_file = LABEL_FILE
   input_height = 299
   input_width = 299
   input_mean = 128
@@ -100,33 +302,17 @@ def main(img):
   if args.output_layer:
     output_layer = args.output_layer
 
-  graph = load_graph(model_file)
-  t = read_tensor_from_image_file(file_name,
-                                  input_height=input_height,
-                                  input_width=input_width,
-                                  input_mean=input_mean,
-                                  input_std=input_std)
-
-  input_name = "import/" + input_layer
-  output_name = "import/" + output_layer
-  input_operation = graph.get_operation_by_name(input_name);
-  output_operation = graph.get_operation_by_name(output_name);
-
-
-  with tf.Session(graph=graph) as sess:
-    start = time.time()
-    results = sess.run(output_operation.outputs[0],
-                      {input_operation.outputs[0]: t})
-    end=time.time()
-  results = np.squeeze(results)
-
-  top_k = results.argsort()[-5:][::-1]
-  labels = load_labels(label_file)
-
-
-
-
+  classifier = ImageClassifier(model_file, label_file,
+                               input_height=input_height,
+                               input_width=input_width,
+                               input_mean=input_mean,
+                               input_std=input_std,
+                               input_layer=input_layer,
+                               output_layer=output_layer)
+  results = classifier.classify_file(file_name)
+  classifier.close()
+  return max(results, key=results.get)
 
 
-  for i in top_k:
-    return labels[i]
\ No newline at end of file
+if __name__ == "__main__":
+  print(main(None))
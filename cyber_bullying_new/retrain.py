@@ -5,13 +5,16 @@ from __future__ import print_function
 
 import argparse
 import collections
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import hashlib
+import json
 import os.path
 import random
 import re
 import sys
 import tarfile
+import time
 
 import numpy as np
 from six.moves import urllib
@@ -23,6 +26,8 @@ from tensorflow.python.framework import tensor_shape
 from tensorflow.python.platform import gfile
 from tensorflow.python.util import compat
 
+from graph_utils import allow_batches
+
 FLAGS = None
 
 # These are all parameters that are tied to the particular model architecture
@@ -169,6 +174,198 @@ def get_bottleneck_path(image_lists, label_name, index, bottleneck_dir,
                         category) + '_' + architecture + '.txt'
 
 
+def get_bottleneck_key(image_lists, label_name, index, category):
+  """Returns the bottleneck store key for a label at the given index.
+
+  Args:
+    image_lists: Dictionary of training images for each label.
+    label_name: Label string we want to get an image for.
+    index: Integer offset of the image we want. This will be moduloed by the
+    available number of images for the label, so it can be arbitrarily large.
+    category: Name string of set to pull images from - training, testing, or
+    validation.
+
+  Returns:
+    Key string '<label dir>/<image file name>'. It does not depend on the
+    category, so changing the split percentages keeps cached rows valid.
+  """
+  label_lists = image_lists[label_name]
+  category_list = label_lists[category]
+  if not category_list:
+    tf.logging.fatal('Label %s has no images in the category %s.',
+                     label_name, category)
+  return label_lists['dir'] + '/' + category_list[index % len(category_list)]
+
+
+class BottleneckStore(object):
+  """Bottleneck values of every image in one memory-mapped float32 .npy file.
+
+  Row r of bottlenecks_<architecture>.npy in the bottleneck directory holds
+  the values of the image that bottlenecks_<architecture>_index.json maps to
+  r, so a training batch is gathered with one fancy-indexed read instead of
+  opening and parsing a text file per image. Rows are written to the mapped
+  file first and the index is replaced atomically afterwards by `save()`;
+  rows added after the last save are simply recomputed after a crash.
+  Every row has `size` values; a store whose index and array disagree on
+  that, or on the number of rows, is discarded and rebuilt.
+  """
+
+  def __init__(self, bottleneck_dir, architecture, size=None):
+    self.path = os.path.join(bottleneck_dir,
+                             'bottlenecks_%s.npy' % architecture)
+    self.index_path = os.path.join(bottleneck_dir,
+                                   'bottlenecks_%s_index.json' % architecture)
+    self.rows = {}
+    self.array = None
+    self.size = size
+    self.dirty = False
+    if os.path.exists(self.index_path) and os.path.exists(self.path):
+      with open(self.index_path) as f:
+        index = json.load(f)
+      array = np.load(self.path, mmap_mode='r+')
+      expected = size if size is not None else index['size']
+      if (array.ndim != 2 or array.shape[1] != index['size'] or
+          array.shape[1] != expected or
+          max(index['rows'].values(), default=-1) >= array.shape[0]):
+        tf.logging.warning('Discarding %s: index says %d values per row, '
+                           'expected %d, array is %s', self.path,
+                           index['size'], expected, array.shape)
+        del array
+      else:
+        self.rows = index['rows']
+        self.array = array
+        self.size = expected
+
+  def __contains__(self, key):
+    return key in self.rows
+
+  def __len__(self):
+    return len(self.rows)
+
+  def reserve(self, count, size):
+    """Makes sure `count` more rows of `size` values fit without growing."""
+    if self.size is not None and size != self.size:
+      raise ValueError('Bottlenecks in %s have %d values, not %d' %
+                       (self.path, self.size, size))
+    self.size = size
+    needed = len(self.rows) + count
+    if self.array is not None and self.array.shape[0] >= needed:
+      return
+    tmp_path = self.path + '.tmp'
+    array = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32,
+                                      shape=(needed, size))
+    if self.array is not None:
+      array[:len(self.rows)] = self.array[:len(self.rows)]
+    array.flush()
+    del array
+    self.array = None
+    os.replace(tmp_path, self.path)
+    self.array = np.load(self.path, mmap_mode='r+')
+
+  def put(self, key, values):
+    if self.size is not None and np.shape(values) != (self.size,):
+      raise ValueError('Bottleneck for %s has shape %s, expected (%d,)' %
+                       (key, np.shape(values), self.size))
+    row = self.rows.get(key)
+    if row is None:
+      row = len(self.rows)
+      if self.array is None or row >= self.array.shape[0]:
+        # Double the capacity rather than growing one row at a time
+        self.reserve(max(1, row), len(values))
+    self.array[row] = values
+    self.rows[key] = row
+    self.dirty = True
+
+  def put_text_file(self, key, text_path):
+    """Adds a bottleneck from a legacy comma-separated text file.
+
+    Returns:
+      False if the file is missing, does not parse as floats or (say, after a
+      partial write) holds a different number of values than the store.
+    """
+    if not os.path.exists(text_path):
+      return False
+    with open(text_path, 'r') as bottleneck_file:
+      bottleneck_string = bottleneck_file.read()
+    try:
+      values = np.array(bottleneck_string.split(','), dtype=np.float32)
+    except ValueError:
+      tf.logging.warning('Invalid float found in %s', text_path)
+      return False
+    if self.size is not None and values.shape != (self.size,):
+      tf.logging.warning('%s has %d values, expected %d', text_path,
+                         values.size, self.size)
+      return False
+    self.put(key, values)
+    return True
+
+  def get(self, key):
+    return np.array(self.array[self.rows[key]])
+
+  def gather(self, rows):
+    """Returns an array of the given rows, in order."""
+    if self.array is None:
+      return np.zeros((0, 0), dtype=np.float32)
+    return np.asarray(self.array[np.asarray(rows, dtype=np.int64)])
+
+  def save(self):
+    """Flushes the rows, then atomically replaces the index."""
+    if not self.dirty:
+      return
+    self.array.flush()
+    tmp_path = self.index_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+      json.dump({'size': self.array.shape[1], 'rows': self.rows}, f)
+    os.replace(tmp_path, self.index_path)
+    self.dirty = False
+
+
+bottleneck_stores = {}
+
+
+def get_bottleneck_store(bottleneck_dir, architecture):
+  """Returns the BottleneckStore for a directory, opened once per process."""
+  key = (bottleneck_dir, architecture)
+  if key not in bottleneck_stores:
+    ensure_dir_exists(bottleneck_dir)
+    model_info = create_model_info(architecture)
+    size = model_info['bottleneck_tensor_size'] if model_info else None
+    bottleneck_stores[key] = BottleneckStore(bottleneck_dir, architecture, size)
+  return bottleneck_stores[key]
+
+
+def convert_text_bottlenecks(bottleneck_dir, architecture):
+  """Copies legacy per-image text bottleneck files into the store.
+
+  Args:
+    bottleneck_dir: Folder string holding <label dir>/<image>_<arch>.txt files.
+    architecture: The name of the model architecture.
+
+  Returns:
+    Number of bottlenecks added to the store.
+  """
+  suffix = '_' + architecture + '.txt'
+  store = get_bottleneck_store(bottleneck_dir, architecture)
+  added = 0
+  for sub_dir in sorted(os.listdir(bottleneck_dir)):
+    sub_dir_path = os.path.join(bottleneck_dir, sub_dir)
+    if not os.path.isdir(sub_dir_path):
+      continue
+    for file_name in sorted(os.listdir(sub_dir_path)):
+      if not file_name.endswith(suffix):
+        continue
+      key = sub_dir + '/' + file_name[:-len(suffix)]
+      if key in store:
+        continue
+      if store.put_text_file(key, os.path.join(sub_dir_path, file_name)):
+        added += 1
+        if added % 1000 == 0:
+          store.save()
+          tf.logging.info(str(added) + ' bottlenecks converted.')
+  store.save()
+  return added
+
+
 def create_model_graph(model_info):
   """"Creates a graph from saved GraphDef file and returns a Graph object.
 
@@ -184,6 +381,10 @@ def create_model_graph(model_info):
     with gfile.FastGFile(model_path, 'rb') as f:
       graph_def = tf.GraphDef()
       graph_def.ParseFromString(f.read())
+      # Let cache_bottlenecks() run whole batches through the bottleneck
+      # reshape; the exported graph keeps that, as label_image expects
+      allow_batches(graph_def,
+                    model_info['bottleneck_tensor_name'].split(':')[0])
       bottleneck_tensor, resized_input_tensor = (tf.import_graph_def(
           graph_def,
           name='',
@@ -263,12 +464,11 @@ def ensure_dir_exists(dir_name):
 bottleneck_path_2_bottleneck_values = {}
 
 
-def create_bottleneck_file(bottleneck_path, image_lists, label_name, index,
-                           image_dir, category, sess, jpeg_data_tensor,
-                           decoded_image_tensor, resized_input_tensor,
-                           bottleneck_tensor):
-  """Create a single bottleneck file."""
-  tf.logging.info('Creating bottleneck at ' + bottleneck_path)
+def create_bottleneck(store, key, image_lists, label_name, index, image_dir,
+                      category, sess, jpeg_data_tensor, decoded_image_tensor,
+                      resized_input_tensor, bottleneck_tensor):
+  """Calculate a single bottleneck and add it to the store."""
+  tf.logging.info('Creating bottleneck for ' + key)
   image_path = get_image_path(image_lists, label_name, index,
                               image_dir, category)
   if not gfile.Exists(image_path):
@@ -281,9 +481,7 @@ def create_bottleneck_file(bottleneck_path, image_lists, label_name, index,
   except Exception as e:
     raise RuntimeError('Error during processing file %s (%s)' % (image_path,
                                                                  str(e)))
-  bottleneck_string = ','.join(str(x) for x in bottleneck_values)
-  with open(bottleneck_path, 'w') as bottleneck_file:
-    bottleneck_file.write(bottleneck_string)
+  store.put(key, bottleneck_values)
 
 
 def get_or_create_bottleneck(sess, image_lists, label_name, index, image_dir,
@@ -292,8 +490,9 @@ def get_or_create_bottleneck(sess, image_lists, label_name, index, image_dir,
                              bottleneck_tensor, architecture):
   """Retrieves or calculates bottleneck values for an image.
 
-  If a cached version of the bottleneck data exists on-disk, return that,
-  otherwise calculate the data and save it to disk for future use.
+  If the image is in the bottleneck store, return its row, otherwise
+  calculate the data (or import it from an old text cache file) and add it to
+  the store for future use.
 
   Args:
     sess: The current active TensorFlow Session.
@@ -305,7 +504,7 @@ def get_or_create_bottleneck(sess, image_lists, label_name, index, image_dir,
     images.
     category: Name string of which  set to pull images from - training, testing,
     or validation.
-    bottleneck_dir: Folder string holding cached files of bottleneck values.
+    bottleneck_dir: Folder string holding the bottleneck store.
     jpeg_data_tensor: The tensor to feed loaded jpeg data into.
     decoded_image_tensor: The output of decoding and resizing the image.
     resized_input_tensor: The input node of the recognition graph.
@@ -315,80 +514,181 @@ def get_or_create_bottleneck(sess, image_lists, label_name, index, image_dir,
   Returns:
     Numpy array of values produced by the bottleneck layer for the image.
   """
-  label_lists = image_lists[label_name]
-  sub_dir = label_lists['dir']
-  sub_dir_path = os.path.join(bottleneck_dir, sub_dir)
-  ensure_dir_exists(sub_dir_path)
-  bottleneck_path = get_bottleneck_path(image_lists, label_name, index,
-                                        bottleneck_dir, category, architecture)
-  if not os.path.exists(bottleneck_path):
-    create_bottleneck_file(bottleneck_path, image_lists, label_name, index,
-                           image_dir, category, sess, jpeg_data_tensor,
-                           decoded_image_tensor, resized_input_tensor,
-                           bottleneck_tensor)
-  with open(bottleneck_path, 'r') as bottleneck_file:
-    bottleneck_string = bottleneck_file.read()
-  did_hit_error = False
+  store = get_bottleneck_store(bottleneck_dir, architecture)
+  key = get_bottleneck_key(image_lists, label_name, index, category)
+  if key not in store:
+    # Reuse a text file from the old per-image cache if there is a valid one
+    bottleneck_path = get_bottleneck_path(image_lists, label_name, index,
+                                          bottleneck_dir, category,
+                                          architecture)
+    if not store.put_text_file(key, bottleneck_path):
+      create_bottleneck(store, key, image_lists, label_name, index, image_dir,
+                        category, sess, jpeg_data_tensor,
+                        decoded_image_tensor, resized_input_tensor,
+                        bottleneck_tensor)
+  return store.get(key)
+
+
+def decode_image_file(sess, image_path, jpeg_data_tensor,
+                      decoded_image_tensor):
+  """Reads an image file and runs the decoding and resizing ops on it.
+
+  Args:
+    sess: The current active TensorFlow Session.
+    image_path: Path string of the image file.
+    jpeg_data_tensor: Input tensor for jpeg data from file.
+    decoded_image_tensor: The output of decoding and resizing the image.
+
+  Returns:
+    Numpy array of shape [1, height, width, depth].
+  """
+  if not gfile.Exists(image_path):
+    tf.logging.fatal('File does not exist %s', image_path)
+  image_data = gfile.FastGFile(image_path, 'rb').read()
   try:
-    bottleneck_values = [float(x) for x in bottleneck_string.split(',')]
-  except ValueError:
-    tf.logging.warning('Invalid float found, recreating bottleneck')
-    did_hit_error = True
-  if did_hit_error:
-    create_bottleneck_file(bottleneck_path, image_lists, label_name, index,
-                           image_dir, category, sess, jpeg_data_tensor,
-                           decoded_image_tensor, resized_input_tensor,
-                           bottleneck_tensor)
-    with open(bottleneck_path, 'r') as bottleneck_file:
-      bottleneck_string = bottleneck_file.read()
-    # Allow exceptions to propagate here, since they shouldn't happen after a
-    # fresh creation
-    bottleneck_values = [float(x) for x in bottleneck_string.split(',')]
-  return bottleneck_values
+    return sess.run(decoded_image_tensor, {jpeg_data_tensor: image_data})
+  except Exception as e:
+    raise RuntimeError('Error during processing file %s (%s)' % (image_path,
+                                                                 str(e)))
+
+
+def run_bottleneck_on_batch(sess, resized_inputs, resized_input_tensor,
+                            bottleneck_tensor):
+  """Runs the recognition network once on a batch of decoded images.
+
+  Args:
+    sess: Current active TensorFlow Session.
+    resized_inputs: Numpy array of decoded images, one per row.
+    resized_input_tensor: The input node of the recognition graph.
+    bottleneck_tensor: Layer before the final softmax.
+
+  Returns:
+    Numpy array with the bottleneck values of each image in a row.
+  """
+  bottleneck_values = sess.run(bottleneck_tensor,
+                               {resized_input_tensor: resized_inputs})
+  return np.reshape(bottleneck_values, (len(resized_inputs), -1))
+
+
+def format_duration(seconds):
+  minutes, seconds = divmod(int(seconds), 60)
+  hours, minutes = divmod(minutes, 60)
+  return '%d:%02d:%02d' % (hours, minutes, seconds)
 
 
 def cache_bottlenecks(sess, image_lists, image_dir, bottleneck_dir,
                       jpeg_data_tensor, decoded_image_tensor,
-                      resized_input_tensor, bottleneck_tensor, architecture):
+                      resized_input_tensor, bottleneck_tensor, architecture,
+                      batch_size=32, threads=4):
   """Ensures all the training, testing, and validation bottlenecks are cached.
 
   Because we're likely to read the same image multiple times (if there are no
   distortions applied during training) it can speed things up a lot if we
   calculate the bottleneck layer values once for each image during
   preprocessing, and then just read those cached values repeatedly during
-  training. Here we go through all the images we've found, calculate those
-  values, and save them off.
+  training. Here we go through all the images we've found that are not in the
+  bottleneck store yet, calculate those values, and save them off.
+
+  Images are read and decoded on `threads` threads and run through the
+  recognition network `batch_size` at a time, while the next batch is being
+  decoded. The store is saved after every batch, so an interrupted run
+  resumes with the first image it had not finished.
 
   Args:
     sess: The current active TensorFlow Session.
     image_lists: Dictionary of training images for each label.
     image_dir: Root folder string of the subfolders containing the training
     images.
-    bottleneck_dir: Folder string holding cached files of bottleneck values.
+    bottleneck_dir: Folder string holding the bottleneck store.
     jpeg_data_tensor: Input tensor for jpeg data from file.
     decoded_image_tensor: The output of decoding and resizing the image.
     resized_input_tensor: The input node of the recognition graph.
     bottleneck_tensor: The penultimate output layer of the graph.
     architecture: The name of the model architecture.
+    batch_size: Number of images per run of the recognition network.
+    threads: Number of threads reading and decoding images.
 
   Returns:
     Nothing.
   """
-  how_many_bottlenecks = 0
   ensure_dir_exists(bottleneck_dir)
+  store = get_bottleneck_store(bottleneck_dir, architecture)
+  missing = []
+  imported = 0
   for label_name, label_lists in image_lists.items():
     for category in ['training', 'testing', 'validation']:
-      category_list = label_lists[category]
-      for index, unused_base_name in enumerate(category_list):
-        get_or_create_bottleneck(
-            sess, image_lists, label_name, index, image_dir, category,
-            bottleneck_dir, jpeg_data_tensor, decoded_image_tensor,
-            resized_input_tensor, bottleneck_tensor, architecture)
-
-        how_many_bottlenecks += 1
-        if how_many_bottlenecks % 100 == 0:
-          tf.logging.info(
-              str(how_many_bottlenecks) + ' bottleneck files created.')
+      for index in range(len(label_lists[category])):
+        key = get_bottleneck_key(image_lists, label_name, index, category)
+        if key in store:
+          continue
+        # Reuse a text file from the old per-image cache if there is a valid one
+        bottleneck_path = get_bottleneck_path(image_lists, label_name, index,
+                                              bottleneck_dir, category,
+                                              architecture)
+        if store.put_text_file(key, bottleneck_path):
+          imported += 1
+          continue
+        missing.append((key, get_image_path(image_lists, label_name, index,
+                                            image_dir, category)))
+  store.save()
+  tf.logging.info('%d bottlenecks cached (%d imported from text files), '
+                  '%d to create.', len(store), imported, len(missing))
+  if not missing:
+    return
+
+  bottleneck_size = tensor_shape.dimension_value(bottleneck_tensor.shape[-1])
+  if bottleneck_size:
+    store.reserve(len(missing), bottleneck_size)
+  batch_size = max(1, batch_size)
+  batches = [missing[i:i + batch_size]
+             for i in range(0, len(missing), batch_size)]
+  batched = batch_size > 1
+  pending = []
+  created = 0
+  start = last_report = time.time()
+  with ThreadPoolExecutor(threads) as pool:
+
+    def decode(batch):
+      return [pool.submit(decode_image_file, sess, image_path,
+                          jpeg_data_tensor, decoded_image_tensor)
+              for _, image_path in batch]
+
+    try:
+      pending = decode(batches[0])
+      for batch_index, batch in enumerate(batches):
+        resized_inputs = np.concatenate([f.result() for f in pending])
+        # Decode the next batch on the pool while this one runs
+        if batch_index + 1 < len(batches):
+          pending = decode(batches[batch_index + 1])
+        if batched:
+          try:
+            bottleneck_values = run_bottleneck_on_batch(
+                sess, resized_inputs, resized_input_tensor, bottleneck_tensor)
+          except (ValueError, tf.errors.InvalidArgumentError):
+            tf.logging.warning('The recognition graph does not take batches, '
+                               'creating bottlenecks one at a time.')
+            batched = False
+        if not batched:
+          bottleneck_values = np.concatenate([
+              run_bottleneck_on_batch(sess, resized_inputs[i:i + 1],
+                                      resized_input_tensor, bottleneck_tensor)
+              for i in range(len(resized_inputs))])
+        for (key, _), values in zip(batch, bottleneck_values):
+          store.put(key, values)
+        store.save()
+
+        created += len(batch)
+        now = time.time()
+        if now - last_report >= 10 or created == len(missing):
+          last_report = now
+          rate = created / (now - start)
+          tf.logging.info('%d/%d bottlenecks created, %.1f images/s, ETA %s',
+                          created, len(missing), rate,
+                          format_duration((len(missing) - created) / rate))
+    finally:
+      for future in pending:
+        future.cancel()
+      store.save()
 
 
 def get_random_cached_bottlenecks(sess, image_lists, how_many, category,
@@ -398,7 +698,7 @@ def get_random_cached_bottlenecks(sess, image_lists, how_many, category,
   """Retrieves bottleneck values for cached images.
 
   If no distortions are being applied, this function can retrieve the cached
-  bottleneck values directly from disk for images. It picks a random set of
+  bottleneck values from the memory-mapped store. It picks a random set of
   images from the specified category.
 
   Args:
@@ -408,7 +708,7 @@ def get_random_cached_bottlenecks(sess, image_lists, how_many, category,
     If negative, all bottlenecks will be retrieved.
     category: Name string of which set to pull from - training, testing, or
     validation.
-    bottleneck_dir: Folder string holding cached files of bottleneck values.
+    bottleneck_dir: Folder string holding the bottleneck store.
     image_dir: Root folder string of the subfolders containing the training
     images.
     jpeg_data_tensor: The layer to feed jpeg image data into.
@@ -418,46 +718,43 @@ def get_random_cached_bottlenecks(sess, image_lists, how_many, category,
     architecture: The name of the model architecture.
 
   Returns:
-    List of bottleneck arrays, their corresponding ground truths, and the
-    relevant filenames.
+    Array of bottlenecks (one row per image), their corresponding ground
+    truths, and the relevant filenames.
   """
   class_count = len(image_lists.keys())
-  bottlenecks = []
-  ground_truths = []
-  filenames = []
+  label_names = list(image_lists.keys())
+  samples = []
   if how_many >= 0:
     # Retrieve a random sample of bottlenecks.
     for unused_i in range(how_many):
       label_index = random.randrange(class_count)
-      label_name = list(image_lists.keys())[label_index]
       image_index = random.randrange(MAX_NUM_IMAGES_PER_CLASS + 1)
-      image_name = get_image_path(image_lists, label_name, image_index,
-                                  image_dir, category)
-      bottleneck = get_or_create_bottleneck(
+      samples.append((label_index, image_index))
+  else:
+    # Retrieve all bottlenecks.
+    for label_index, label_name in enumerate(label_names):
+      for image_index in range(len(image_lists[label_name][category])):
+        samples.append((label_index, image_index))
+  store = get_bottleneck_store(bottleneck_dir, architecture)
+  rows = []
+  filenames = []
+  for label_index, image_index in samples:
+    label_name = label_names[label_index]
+    key = get_bottleneck_key(image_lists, label_name, image_index, category)
+    if key not in store:
+      get_or_create_bottleneck(
           sess, image_lists, label_name, image_index, image_dir, category,
           bottleneck_dir, jpeg_data_tensor, decoded_image_tensor,
           resized_input_tensor, bottleneck_tensor, architecture)
-      ground_truth = np.zeros(class_count, dtype=np.float32)
-      ground_truth[label_index] = 1.0
-      bottlenecks.append(bottleneck)
-      ground_truths.append(ground_truth)
-      filenames.append(image_name)
-  else:
-    # Retrieve all bottlenecks.
-    for label_index, label_name in enumerate(image_lists.keys()):
-      for image_index, image_name in enumerate(
-          image_lists[label_name][category]):
-        image_name = get_image_path(image_lists, label_name, image_index,
-                                    image_dir, category)
-        bottleneck = get_or_create_bottleneck(
-            sess, image_lists, label_name, image_index, image_dir, category,
-            bottleneck_dir, jpeg_data_tensor, decoded_image_tensor,
-            resized_input_tensor, bottleneck_tensor, architecture)
-        ground_truth = np.zeros(class_count, dtype=np.float32)
-        ground_truth[label_index] = 1.0
-        bottlenecks.append(bottleneck)
-        ground_truths.append(ground_truth)
-        filenames.append(image_name)
+    rows.append(store.rows[key])
+    filenames.append(get_image_path(image_lists, label_name, image_index,
+                                    image_dir, category))
+  store.save()
+  # One gather from the memory-mapped store for the whole batch
+  bottlenecks = store.gather(rows)
+  label_indices = np.array([label_index for label_index, _ in samples],
+                           dtype=np.int64)
+  ground_truths = np.eye(class_count, dtype=np.float32)[label_indices]
   return bottlenecks, ground_truths, filenames
 
 
@@ -932,7 +1229,8 @@ def main(_):
       cache_bottlenecks(sess, image_lists, FLAGS.image_dir,
                         FLAGS.bottleneck_dir, jpeg_data_tensor,
                         decoded_image_tensor, resized_image_tensor,
-                        bottleneck_tensor, FLAGS.architecture)
+                        bottleneck_tensor, FLAGS.architecture,
+                        FLAGS.bottleneck_batch_size, FLAGS.bottleneck_threads)
 
     # Add the new layer that we'll be training.
     (train_step, cross_entropy, bottleneck_input, ground_truth_input,
@@ -1173,7 +1471,20 @@ if __name__ == '__main__':
       '--bottleneck_dir',
       type=str,
       default='/tmp/bottleneck',
-      help='Path to cache bottleneck layer values as files.'
+      help='Path to cache bottleneck layer values in.'
+  )
+  parser.add_argument(
+      '--bottleneck_batch_size',
+      type=int,
+      default=32,
+      help='How many images to run through the model at once when caching '
+      'bottlenecks.'
+  )
+  parser.add_argument(
+      '--bottleneck_threads',
+      type=int,
+      default=4,
+      help='How many threads read and decode images when caching bottlenecks.'
   )
   parser.add_argument(
       '--final_tensor_name',
@@ -0,0 +1,123 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Coalesce concurrent per-post predictions into batched model calls.
+
+    Request threads call `predict()` with their own rows and block. A single
+    background thread collects pending rows until `max_batch_size` rows are
+    queued or `max_wait` seconds have passed since the first one arrived, runs
+    one `predict_fn` call on the stacked rows and hands each caller back its
+    own output row. Only the background thread ever touches the model.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=32, max_wait=0.005):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait))
+        self._pending = []
+        self._cond = threading.Condition()
+        self._worker = None
+        self._closed = False
+        self.batches = 0
+        self.rows = 0
+
+    def submit(self, row):
+        """Queue a single input row and return a Future for its output row."""
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('MicroBatcher is closed')
+            self._pending.append((row, future))
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='text-model-batcher', daemon=True)
+                self._worker.start()
+            self._cond.notify()
+        return future
+
+    def predict(self, X, timeout=None):
+        """Drop-in replacement for `model.predict(X)` that goes through the batcher."""
+        futures = [self.submit(row) for row in X]
+        return np.stack([f.result(timeout) for f in futures])
+
+    def close(self):
+        """Stop accepting rows; rows already queued are still scored."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._worker is not None:
+            self._worker.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                deadline = time.monotonic() + self.max_wait
+                while len(self._pending) < self.max_batch_size and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.max_batch_size]
+                del self._pending[:self.max_batch_size]
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        rows = [row for row, _ in batch]
+        futures = [future for _, future in batch]
+        try:
+            outputs = self.predict_fn(np.stack(rows))
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.rows += len(rows)
+        for future, output in zip(futures, outputs):
+            future.set_result(output)
+
+
+class BucketedModel:
+    """Run each input row at its bucket's sequence length instead of max_len.
+
+    Rows are grouped by real length (position of the last non-zero id) into
+    the smallest bucket that fits, truncated to that many timesteps and
+    scored with one `predict` per bucket. The wrapped model must accept
+    variable-length input (NumpyLSTM does; for Keras see
+    `text_classifier.variable_length_model`).
+
+    The model was trained on sequences post-padded to max_len, so its
+    output also depends on the padding steps; skipping them shifts scores
+    slightly. tools/bench_length_buckets.py reports that drift.
+    """
+
+    def __init__(self, model, buckets):
+        self.model = model
+        self.buckets = sorted(int(b) for b in buckets)
+
+    def predict(self, X, verbose=0):
+        X = np.asarray(X)
+        if len(X) == 0:
+            return self.model.predict(X, verbose=0)
+        nonzero = X != 0
+        # Index of the last non-zero id + 1; all-zero rows have length 0
+        lengths = np.where(nonzero.any(axis=1), X.shape[1] - np.argmax(nonzero[:, ::-1], axis=1), 0)
+        outputs = None
+        lower = -1
+        for bucket in self.buckets + [X.shape[1]]:
+            rows = np.flatnonzero((lengths > lower) & (lengths <= bucket))
+            lower = bucket
+            if len(rows) == 0:
+                continue
+            result = self.model.predict(X[rows, :max(bucket, 1)], verbose=0)
+            if outputs is None:
+                outputs = np.empty((len(X),) + result.shape[1:], dtype=result.dtype)
+            outputs[rows] = result
+        return outputs
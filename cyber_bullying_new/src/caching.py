@@ -0,0 +1,186 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU mapping with hit/miss counters."""
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = max(0, int(maxsize))
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.maxsize == 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCache:
+    """Key/value table in a SQLite file that survives restarts.
+
+    Rows remember when they were last read; once the table holds more than
+    `max_entries` rows the least recently used ones are deleted.
+    """
+
+    def __init__(self, path, table='cache', max_entries=100000):
+        self.path = str(path)
+        self.table = table
+        self.max_entries = int(max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS '{table}' (key TEXT PRIMARY KEY NOT NULL, value, last_used REAL NOT NULL)")
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS '{table}_last_used' ON '{table}' (last_used)")
+
+    def get(self, key, default=None):
+        with self._lock, self._conn:
+            row = self._conn.execute(f"SELECT value FROM '{self.table}' WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+            self._conn.execute(f"UPDATE '{self.table}' SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, value):
+        with self._lock, self._conn:
+            self._conn.execute(f"INSERT OR REPLACE INTO '{self.table}' (key, value, last_used) VALUES (?, ?, ?)", (key, value, time.time()))
+            count = self._conn.execute(f"SELECT COUNT(*) FROM '{self.table}'").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(f"DELETE FROM '{self.table}' WHERE key IN (SELECT key FROM '{self.table}' ORDER BY last_used LIMIT ?)", (count - self.max_entries,))
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM '{self.table}'").fetchone()[0]
+
+
+class TieredCache:
+    """In-memory LRU in front of an optional SQLiteCache.
+
+    Disk hits are promoted into memory. `stats()` reports hits per tier,
+    misses and the overall hit rate.
+    """
+
+    def __init__(self, memory_size=10000, db_path=None, table='cache', max_entries=100000):
+        self.memory = LRUCache(memory_size)
+        self.disk = SQLiteCache(db_path, table, max_entries) if db_path else None
+
+    def get(self, key, default=None):
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.put(key, value)
+                return value
+        return default
+
+    def put(self, key, value):
+        self.memory.put(key, value)
+        if self.disk is not None:
+            self.disk.put(key, value)
+
+    def stats(self):
+        memory_hits = self.memory.hits
+        disk_hits = self.disk.hits if self.disk is not None else 0
+        misses = self.disk.misses if self.disk is not None else self.memory.misses
+        lookups = memory_hits + disk_hits + misses
+        return {
+            'memory_hits': memory_hits,
+            'disk_hits': disk_hits,
+            'misses': misses,
+            'hit_rate': (memory_hits + disk_hits) / lookups if lookups else 0.0,
+            'memory_entries': len(self.memory),
+            'disk_entries': len(self.disk) if self.disk is not None else 0,
+        }
+
+
+class ScoreCache(TieredCache):
+    """Text model scores keyed by cleaned text and model fingerprint.
+
+    Keys include the fingerprint so scores from an older model are never
+    returned after the weights or vocabulary change.
+    """
+
+    def __init__(self, fingerprint, memory_size=10000, db_path=None, max_entries=100000):
+        super().__init__(memory_size, db_path, 'scores', max_entries)
+        self.fingerprint = fingerprint
+
+    def key(self, cleaned):
+        return hashlib.sha256(f'{self.fingerprint}\0{cleaned}'.encode('utf-8')).hexdigest()
+
+    def get_score(self, cleaned):
+        return self.get(self.key(cleaned))
+
+    def put_score(self, cleaned, score):
+        self.put(self.key(cleaned), float(score))
+
+
+class OCRCache(TieredCache):
+    """Recognized text keyed by the decoded image and the OCR settings.
+
+    Hashing pixels rather than file bytes means the same image re-uploaded
+    under another name, or re-saved with different metadata, still hits.
+    """
+
+    def __init__(self, memory_size=256, db_path=None, max_entries=50000):
+        super().__init__(memory_size, db_path, 'ocr', max_entries)
+
+    @staticmethod
+    def key(pixels, settings):
+        digest = hashlib.sha256(f'{settings}\0{pixels.dtype}\0{pixels.shape}\0'.encode('utf-8'))
+        digest.update(memoryview(pixels).cast('B') if pixels.flags.c_contiguous else pixels.tobytes())
+        return digest.hexdigest()
+
+
+class ImageResultCache(TieredCache):
+    """Fake-image classifier output keyed by the uploaded bytes and the graph.
+
+    Values are the full {label: probability} mapping, stored as JSON. Keys
+    include the classifier fingerprint (a checksum of the graph, labels and
+    preprocessing), so retraining invalidates every entry.
+    """
+
+    def __init__(self, fingerprint, memory_size=1000, db_path=None, max_entries=50000):
+        super().__init__(memory_size, db_path, 'images', max_entries)
+        self.fingerprint = fingerprint
+
+    def key(self, data):
+        digest = hashlib.sha256(f'{self.fingerprint}\0'.encode('utf-8'))
+        digest.update(data)
+        return digest.hexdigest()
+
+    def get_probabilities(self, key):
+        value = self.get(key)
+        return json.loads(value) if value is not None else None
+
+    def put_probabilities(self, key, probabilities):
+        self.put(key, json.dumps(probabilities))
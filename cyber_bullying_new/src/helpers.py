@@ -22,6 +22,15 @@ def UserInfo(db, username = None):
             dp = "../static/dp/" + user_id_info['username'] + "." + user_id_info['dp']
     return user_id_info, dp
 
+def ensure_post_models(db):
+    # Which text model produced each post's stored 'nature', as text_classifier.inference_fingerprint()
+    # (artifact, backend, quantization and length buckets)
+    db.execute("CREATE TABLE IF NOT EXISTS post_models ('username' TEXT NOT NULL, 'post_id' INTEGER NOT NULL, 'fingerprint' TEXT NOT NULL, PRIMARY KEY (username, post_id))")
+
+def record_post_model(db, username, post_id, fingerprint):
+    # `fingerprint` must be the inference_fingerprint() of the model that scored the post
+    db.execute("INSERT OR REPLACE INTO post_models (username, post_id, fingerprint) VALUES (:username, :post_id, :fingerprint)", username=username, post_id=post_id, fingerprint=fingerprint)
+
 def error(message, code=400):
     meme.meme(message)
     # The random variable prevents browser caching by adding a
@@ -1,32 +1,72 @@
 # MIT License
 
 
-from flask import Blueprint, request, render_template, redirect, session, abort, flash, url_for, current_app
+from flask import Blueprint, request, render_template, redirect, session, abort, flash, url_for, current_app, jsonify
 from src.auth import login_required
-from src.helpers import error, UserInfo
+from src.helpers import error, UserInfo, ensure_post_models, record_post_model
 from cs50 import SQL
 from flask import abort
 from src import reddy_tech
-from src.text_classifier import load_text_model, get_vocab
-import cv2
-import pytesseract
+from src.text_classifier import load_inference_model, get_vocab, inference_fingerprint
+from src.batcher import MicroBatcher
+from src.caching import ScoreCache
+from src.translation import TranslationStage, BACKENDS as TRANSLATION_BACKENDS
+from src.ocr import OCRJobQueue, QueueFull, image_size
 from werkzeug.utils import secure_filename
 import os
 import uuid
-import telepot
+import threading
 import config as app_config
+import socket
 
-# Initialize bot only if token provided
-bot = telepot.Bot(app_config.TELEPOT_TOKEN) if app_config.TELEPOT_TOKEN else None
-#  Mention the installed location of Tesseract-OCR in your system (configurable)
-# Only set tesseract command if provided in config; otherwise rely on PATH
-if getattr(app_config, 'TESSERACT_CMD', None):
-    pytesseract.pytesseract.tesseract_cmd = app_config.TESSERACT_CMD
+# cv2, pytesseract, telepot, googletrans and the model are imported/loaded on
+# first use by the route that needs them, keeping them out of app startup.
+_bot = None
+_translation = None
+_ocr_queue = None
+_upload_writer = None
 
-# Import required packages
-from googletrans import Translator
-translator = Translator()
-import socket
+def get_bot():
+    """Return the telepot bot, or None if no token is configured."""
+    global _bot
+    if _bot is None and app_config.TELEPOT_TOKEN:
+        import telepot
+        _bot = telepot.Bot(app_config.TELEPOT_TOKEN)
+    return _bot
+
+def get_translation():
+    global _translation
+    if _translation is None:
+        _translation = TranslationStage(TRANSLATION_BACKENDS[app_config.TRANSLATION_BACKEND](),
+                                        cache_size=app_config.TRANSLATION_CACHE_SIZE,
+                                        timeout=app_config.TRANSLATION_TIMEOUT,
+                                        failure_threshold=app_config.TRANSLATION_FAILURE_THRESHOLD,
+                                        cooldown=app_config.TRANSLATION_COOLDOWN,
+                                        romanized=app_config.TRANSLATION_ROMANIZED)
+    return _translation
+
+def get_ocr_queue():
+    global _ocr_queue
+    if _ocr_queue is None:
+        _ocr_queue = OCRJobQueue(finish_detect_job,
+                                 workers=app_config.OCR_WORKERS,
+                                 max_pending=app_config.OCR_MAX_PENDING,
+                                 history=app_config.OCR_JOB_HISTORY)
+    return _ocr_queue
+
+def get_upload_writer():
+    global _upload_writer
+    if _upload_writer is None:
+        from concurrent.futures import ThreadPoolExecutor
+        _upload_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='upload-writer')
+    return _upload_writer
+
+def save_upload(path, data):
+    try:
+        with open(path, 'wb') as f:
+            f.write(data)
+    except Exception as e:
+        print('Failed to save uploaded file:', e)
 
 def get_system_ip():
     hostname = socket.gethostname()
@@ -37,15 +77,59 @@ home = Blueprint("home", __name__, static_folder="static", template_folder="temp
 blocked_ips = set()
 
 db = SQL("sqlite:///src/main.db")
-# Load the ML model and initiate Mindhunters using the text_classifier wrapper
-try:
-    model = load_text_model()
-except Exception as e:
-    model = None
-    print('Warning: failed to load text model:', e)
-    import traceback; traceback.print_exc()
-# Ensure vocabulary is available for preprocessing
-word_to_index, max_len = get_vocab()
+ensure_post_models(db)
+
+scorer = None
+word_to_index, max_len = None, None
+score_cache = None
+_text_loaded = False
+_text_lock = threading.Lock()
+
+def load_text_pipeline():
+    """Load the text model, vocabulary and score cache once, on first use.
+
+    Returns the batcher wrapping the model, or None if the model failed to load.
+    """
+    global scorer, word_to_index, max_len, score_cache, _text_loaded
+    if _text_loaded:
+        return scorer
+    with _text_lock:
+        if _text_loaded:
+            return scorer
+        # Load the ML model and initiate Mindhunters using the text_classifier wrapper
+        try:
+            model = load_inference_model(app_config.TEXT_MODEL_BACKEND, app_config.TEXT_LENGTH_BUCKETS)
+        except Exception as e:
+            model = None
+            print('Warning: failed to load text model:', e)
+            import traceback; traceback.print_exc()
+        # Concurrent requests share one batched forward pass instead of one predict per post
+        if model is not None:
+            scorer = MicroBatcher(model.predict,
+                                  max_batch_size=app_config.TEXT_BATCH_MAX_SIZE,
+                                  max_wait=app_config.TEXT_BATCH_MAX_WAIT_MS / 1000.0)
+        # Ensure vocabulary is available for preprocessing
+        word_to_index, max_len = get_vocab()
+        # Reposted and copy-pasted messages reuse their earlier score
+        score_cache = ScoreCache(inference_fingerprint(app_config.TEXT_MODEL_BACKEND, app_config.TEXT_LENGTH_BUCKETS),
+                                 memory_size=app_config.SCORE_CACHE_SIZE,
+                                 db_path=app_config.SCORE_CACHE_DB,
+                                 max_entries=app_config.SCORE_CACHE_DB_ENTRIES)
+        _text_loaded = True
+    return scorer
+
+if app_config.PRELOAD_TEXT_MODEL:
+    load_text_pipeline()
+
+def score_post(post_text):
+    load_text_pipeline()
+    cleaned = reddy_tech.clean_text(post_text)
+    score = score_cache.get_score(cleaned)
+    if score is None:
+        text = reddy_tech.encode_sentences([cleaned], word_to_index, max_len)
+        score = float(scorer.predict(text)[0][0])
+        score_cache.put_score(cleaned, score)
+    return score
 
 @home.route('/unblock_my_ip')
 def unblock_my_ip():
@@ -53,6 +137,58 @@ def unblock_my_ip():
     blocked_ips.discard(my_ip_address)
     return f"IP address {my_ip_address} unblocked successfully"
 
+@home.route('/score_cache_stats')
+@login_required
+def score_cache_stats():
+    load_text_pipeline()
+    return jsonify(score_cache.stats())
+
+@home.route('/translation_stats')
+@login_required
+def translation_stats():
+    return jsonify(get_translation().stats())
+
+def finish_detect_job(job, ocr):
+    """Score the recognized text and store the post; runs on the OCR finisher thread."""
+    context = job['context']
+    post_text = ocr['text']
+    print('\n--------------Recognized Text------------\n')
+    print(post_text)
+    if not post_text:
+        return {'posted': False, 'reason': 'no text recognized'}
+    if load_text_pipeline() is None:
+        raise RuntimeError('Model not loaded; cannot classify')
+
+    ans = score_post(post_text)
+    post_id = db.execute("INSERT INTO :tablename ('text', 'nature', 'image') VALUES (:post_text, :score, :post_img)", tablename=context['username'], post_text=post_text, score=str(ans), post_img=context['web_path'])
+    record_post_model(db, context['username'], post_id, score_cache.fingerprint)
+    # Re-read the totals: other jobs for this user may have finished since the upload
+    userInfo = db.execute("SELECT score, total FROM users WHERE id = :user_id", user_id=context['user_id'])[0]
+    if (ans < 0.4):
+        score = (0.4 - ans)
+        total = "{:.2f}".format(userInfo['total'] + score)
+        good_score = "{:.2f}".format(userInfo['score'] + score)
+        db.execute("UPDATE users SET score=:score, total=:total WHERE id=:user_id", score = good_score, total = total, user_id = context['user_id'])
+    else:
+        score = (ans - 0.8)
+        total = "{:.2f}".format((userInfo['total'] + score))
+        db.execute("UPDATE users SET total=:total WHERE id=:user_id", total = total, user_id = context['user_id'])
+    return {'posted': True, 'post_id': post_id, 'score': ans}
+
+@home.route('/detect/<job_id>')
+@login_required
+def detect_status(job_id):
+    # Other users' jobs (ids are sequential) look the same as unknown ones
+    job = get_ocr_queue().status(job_id, owner=session["user_id"])
+    if job is None:
+        return jsonify({'error': 'unknown job'}), 404
+    return jsonify(job)
+
+@home.route('/ocr_stats')
+@login_required
+def ocr_stats():
+    return jsonify(get_ocr_queue().stats())
+
 @home.route("/detect", methods=["GET", "POST"])
 @login_required
 def detect():
@@ -68,8 +204,10 @@ def detect():
 
     image_path = None
     web_path = None
+    upload = None
 
-    # Handle file upload
+    # Handle file upload: OCR works on the bytes in memory, saving the file
+    # for display is optional and happens in the background
     if uploaded_file and uploaded_file.filename:
         filename = secure_filename(uploaded_file.filename)
         ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
@@ -77,16 +215,12 @@ def detect():
             allowed = ','.join(sorted(getattr(app_config, 'ALLOWED_EXTENSIONS', [])))
             flash('Unsupported file type. Allowed: ' + allowed)
             return redirect('/')
+        upload = uploaded_file.read()
         # create unique filename to avoid collisions
         unique_name = f"{uuid.uuid4().hex}_{filename}"
-        image_path = upload_dir / unique_name
-        try:
-            uploaded_file.save(str(image_path))
-        except Exception as e:
-            print('Failed to save uploaded file:', e)
-            flash('Failed to save uploaded image')
-            return redirect('/')
-        web_path = f'static/images/{unique_name}'
+        if app_config.PERSIST_UPLOADS:
+            image_path = upload_dir / unique_name
+            web_path = f'static/images/{unique_name}'
 
     # Legacy behavior: client may send just a filename string in form
     elif img_field:
@@ -99,43 +233,39 @@ def detect():
         flash('No image provided')
         return redirect('/')
 
-    if not image_path or not image_path.exists():
+    if upload is None and (not image_path or not image_path.exists()):
         print(f'Image file not found: {image_path}')
         flash('Image file not found')
         return redirect('/')
-    # Read the image with OpenCV and verify it loaded
-    image = cv2.imread(str(image_path))
-    if image is None:
-        print(f'cv2.imread failed for: {image_path} (file may be corrupt or unreadable)')
+    source = upload if upload is not None else image_path
+    # Reject decompression bombs from the header alone, before any decoding
+    try:
+        width, height = image_size(source)
+    except Exception as e:
+        print('Could not read image header:', e)
         flash('Uploaded image is unreadable')
         return redirect('/')
-    # Convert the image to gray scale
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    text1=pytesseract.image_to_string(gray)
-    print('\n--------------Recognized Text------------\n')
-    print(text1)     
-    post_text = text1
-    if not post_text:
-        return redirect("/")
-    text = [reddy_tech.clean_text(post_text)]
-    text = reddy_tech.sentences_to_indices(text, word_to_index, max_len)
-    if model is None:
-        flash('Model not loaded; cannot classify')
+    if width * height > app_config.OCR_MAX_PIXELS:
+        print(f'Rejected {width}x{height} image (limit {app_config.OCR_MAX_PIXELS} pixels)')
+        flash('Image is too large')
         return redirect('/')
-
-    ans = model.predict(text)[0][0]
-    db.execute("INSERT INTO :tablename ('text', 'nature', 'image') VALUES (:post_text, :score, :post_img)", tablename=userInfo['username'], post_text=post_text, score=str(ans), post_img=web_path)
-    if (ans < 0.4):
-        score = (0.4 - ans)
-        total = "{:.2f}".format(userInfo['total'] + score)
-        good_score = "{:.2f}".format(userInfo['score'] + score)
-        db.execute("UPDATE users SET score=:score, total=:total WHERE id=:user_id", score = good_score, total = total, user_id = session["user_id"])
-        return redirect("/")
-    else:
-        score = (ans - 0.8)
-        total = "{:.2f}".format((userInfo['total'] + score))
-        db.execute("UPDATE users SET total=:total WHERE id=:user_id", total = total, user_id = session["user_id"])
-        return redirect("/")
+    # OCR, scoring and the post insert happen in the background; the client
+    # can poll /detect/<job_id> for the outcome
+    wants_json = request.accept_mimetypes.best == 'application/json'
+    try:
+        job_id = get_ocr_queue().submit(source, owner=session["user_id"], username=userInfo['username'], user_id=session["user_id"], web_path=web_path)
+    except QueueFull as e:
+        print('Rejected OCR job:', e)
+        if wants_json:
+            return jsonify({'error': 'OCR queue is full'}), 503
+        flash('Too many images are being processed, please try again shortly')
+        return redirect('/')
+    if upload is not None and image_path is not None:
+        get_upload_writer().submit(save_upload, image_path, upload)
+    if wants_json:
+        return jsonify({'job_id': job_id, 'status_url': url_for('home.detect_status', job_id=job_id)}), 202
+    flash('Image received, its text will be posted once recognized')
+    return redirect('/')
 
 
 @home.route("/", methods=["GET", "POST"])
@@ -159,6 +289,7 @@ def index():
             if ((userInfo['score']/userInfo['total'])*10) < 5:
                 blocked_ips.add(get_system_ip())
                 print('blocked')
+                bot = get_bot()
                 if bot:
                     try:
                         bot.sendMessage("5486829784", str("your account is blocked"))
@@ -182,19 +313,13 @@ def index():
             # nothing to post
             return redirect("/")
 
-        # Default to English since language dropdown is removed
-        fromlang = 'en'
-        try:
-            post_text = translator.translate(post_text, src=fromlang, dest='en').text
-        except Exception as e:
-            print('Translation error:', e)
-            # Fall back to original text if translation fails
-            pass
-
-        text = [reddy_tech.clean_text(post_text)]
-        text = reddy_tech.sentences_to_indices(text, word_to_index, max_len)
-        ans = model.predict(text)[0][0]
-        db.execute("INSERT INTO :tablename ('text', 'nature') VALUES (:post_text, :score)", tablename=userInfo['username'], post_text=post_text, score=str(ans))
+        # English posts skip translation; others fall back to the original
+        # text if the backend is slow, failing or short-circuited
+        post_text = get_translation().translate(post_text, dest='en')
+
+        ans = score_post(post_text)
+        post_id = db.execute("INSERT INTO :tablename ('text', 'nature') VALUES (:post_text, :score)", tablename=userInfo['username'], post_text=post_text, score=str(ans))
+        record_post_model(db, userInfo['username'], post_id, score_cache.fingerprint)
         if (ans < 0.4):
             score = (0.4 - ans)
             total = "{:.2f}".format(userInfo['total'] + score)
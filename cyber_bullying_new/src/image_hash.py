@@ -0,0 +1,194 @@
+"""Perceptual hashes and a near-duplicate index of uploaded images.
+
+Reposted memes are re-encoded, resized or slightly cropped, so their bytes
+and pixels differ and the digest-keyed caches miss. `phash()` reduces an
+image to 63 bits that survive those changes: the signs of its low DCT
+frequencies relative to their median. `NearDuplicateIndex` keeps the hashes
+of earlier uploads in a BK-tree per namespace (one namespace per producer
+and settings, e.g. OCR with the current Tesseract options) together with
+the result computed for them, so /detect can reuse OCR text and /image a
+fake/original result. tools/build_image_index.py fills it from existing
+image folders.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+import config as app_config
+
+# Stored results are only reused for images of (nearly) the same shape
+MAX_ASPECT_CHANGE = 0.05
+
+# When the table outgrows max_entries it is trimmed to this fraction of it,
+# so processes rebuild their trees once per trim rather than on every insert
+TRIM_TO = 0.9
+
+_index = None
+_index_pid = None
+
+
+def phash(gray):
+    """63-bit DCT perceptual hash of a grayscale image, as an int."""
+    import cv2
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].flatten()[1:]
+    bits = low > np.median(low)
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+def image_key(gray):
+    """(phash, aspect ratio) used to look an image up in the index."""
+    height, width = gray.shape[:2]
+    return phash(gray), width / height
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+def namespace(kind, settings):
+    """Namespace for results of `kind` produced with `settings` (any string)."""
+    return f"{kind}-{hashlib.sha256(str(settings).encode('utf-8')).hexdigest()[:16]}"
+
+
+class BKTree:
+    """Burkhard-Keller tree of hashes under Hamming distance.
+
+    Each node is [hash, values, {distance: child}]. A search within d bits
+    of a query only descends into children whose edge distance lies within
+    d of the node's own distance to the query.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, key, value):
+        self.size += 1
+        if self.root is None:
+            self.root = [key, [value], {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming(key, node[0])
+            if distance == 0:
+                node[1].append(value)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [key, [value], {}]
+                return
+            node = child
+
+    def search(self, key, max_distance):
+        """(distance, value) pairs within `max_distance` bits, nearest first."""
+        results = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node_key, values, children = stack.pop()
+            distance = hamming(key, node_key)
+            if distance <= max_distance:
+                results.extend((distance, value) for value in values)
+            for edge, child in children.items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        results.sort(key=lambda r: r[0])
+        return results
+
+    def __len__(self):
+        return self.size
+
+
+class NearDuplicateIndex:
+    """Image hashes and their results in SQLite, searched through BK-trees.
+
+    Several processes (the web app, OCR workers, the index CLI) can share
+    one file: every lookup first loads the rows added since the previous
+    one, whichever process wrote them. Beyond `max_entries` rows the oldest
+    are deleted; a process that finds its oldest loaded row gone rebuilds
+    its trees from the table.
+    """
+
+    def __init__(self, path, max_entries=50000):
+        self.path = str(path)
+        self.max_entries = int(max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._trees = {}
+        self._first_id = None
+        self._last_id = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS image_hashes (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                               "namespace TEXT NOT NULL, hash TEXT NOT NULL, aspect REAL NOT NULL, value TEXT NOT NULL)")
+
+    def _refresh(self):
+        if self._first_id is not None:
+            oldest = self._conn.execute("SELECT MIN(id) FROM image_hashes").fetchone()[0]
+            if oldest is None or oldest > self._first_id:
+                # Rows this process loaded were trimmed; BK-trees cannot delete
+                self._trees = {}
+                self._first_id = None
+                self._last_id = 0
+        rows = self._conn.execute("SELECT id, namespace, hash, aspect, value FROM image_hashes WHERE id > ? ORDER BY id",
+                                  (self._last_id,)).fetchall()
+        for row_id, ns, key, aspect, value in rows:
+            self._trees.setdefault(ns, BKTree()).add(int(key, 16), (aspect, value))
+            if self._first_id is None:
+                self._first_id = row_id
+            self._last_id = row_id
+
+    def find(self, ns, key, max_distance):
+        """Value stored for the nearest image within `max_distance` bits, or None.
+
+        `key` is an image_key(); images whose aspect ratio differs by more
+        than MAX_ASPECT_CHANGE never match. A negative distance disables
+        the lookup.
+        """
+        if max_distance < 0:
+            return None
+        image_hash, aspect = key
+        with self._lock:
+            self._refresh()
+            tree = self._trees.get(ns)
+            for _, (stored_aspect, value) in tree.search(image_hash, max_distance) if tree else []:
+                if abs(stored_aspect / aspect - 1) <= MAX_ASPECT_CHANGE:
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def add(self, ns, key, value):
+        image_hash, aspect = key
+        with self._lock, self._conn:
+            row_id = self._conn.execute("INSERT INTO image_hashes (namespace, hash, aspect, value) VALUES (?, ?, ?, ?)",
+                                        (ns, format(image_hash, '016x'), aspect, value)).lastrowid
+            oldest = self._conn.execute("SELECT MIN(id) FROM image_hashes").fetchone()[0]
+            # ids only grow, so this bounds the row count without a COUNT(*) per insert
+            if row_id - oldest >= self.max_entries:
+                self._conn.execute("DELETE FROM image_hashes WHERE id <= ?", (row_id - int(self.max_entries * TRIM_TO),))
+
+    def stats(self):
+        with self._lock:
+            self._refresh()
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': {ns: len(tree) for ns, tree in self._trees.items()},
+            }
+
+
+def get_hash_index():
+    """The shared index for this process, or None if IMAGE_HASH_DB is unset.
+
+    Opened again in a forked child: an SQLite connection must not be used
+    across a fork.
+    """
+    global _index, _index_pid
+    if app_config.IMAGE_HASH_DB and (_index is None or _index_pid != os.getpid()):
+        _index = NearDuplicateIndex(app_config.IMAGE_HASH_DB, app_config.IMAGE_HASH_DB_ENTRIES)
+        _index_pid = os.getpid()
+    return _index
@@ -11,6 +11,10 @@ This script will:
  - build a compatible model and call `model.load_weights(...)`
  - print model.summary()
 
+The reconstruction itself is `text_classifier.reconstruct_from_weights`, so this
+script exercises exactly what `load_text_model()` does. To avoid repeating it on
+every worker start, build the serving artifact with tools/build_model_artifact.py.
+
 Note: This attempts to reconstruct the architecture used in the notebook (two LSTM layers,
 embedding + dropout). If the original architecture differs, loading weights may still fail.
 """
@@ -18,6 +22,11 @@ from pathlib import Path
 import h5py
 import sys
 
+# Replace the script's own directory on sys.path with the project root, otherwise
+# src/profile.py shadows the stdlib profile module that TensorFlow imports
+root = Path(__file__).resolve().parents[1]
+sys.path[0] = str(root)
+
 MODEL_PATH = Path('src/LSTM.h5')
 if not MODEL_PATH.exists():
     print(f"Model file not found: {MODEL_PATH.resolve()}")
@@ -40,58 +49,21 @@ print('Found datasets (name, shape) under model_weights:')
 for name, shape in datasets:
     print('-', name, shape)
 
-# Heuristics: find largest 2D dataset -> embedding weights, find dense kernel -> final Dense
-embedding_shape = None
-dense_out = None
-for name, shape in datasets:
-    if len(shape) == 2:
-        # candidate for embedding (vocab, emb_dim) or dense (in, out)
-        if embedding_shape is None or shape[0] > embedding_shape[0]:
-            embedding_shape = shape
-        # if name contains 'dense' or 'dense_' or 'dense/kernel' prefer it for final dense
-        if 'dense' in name.lower() and (dense_out is None or shape[1] > dense_out):
-            dense_out = shape[1]
+from src.text_classifier import _inspect_weights, reconstruct_from_weights
 
+embedding_shape, dense_out = _inspect_weights(MODEL_PATH)
 print('\nGuessed embedding shape:', embedding_shape)
 print('Guessed final dense output dim:', dense_out)
+if embedding_shape is None:
+    print('Could not detect embedding shape from weights; aborting model reconstruction.')
+    sys.exit(1)
+if dense_out is None:
+    print('Could not detect final dense output dimension. Defaulting to 1 (sigmoid).')
 
-# Now try to reconstruct model and load weights
+# Reconstruct the model and load weights (same code path as load_text_model)
 try:
-    from tensorflow.keras.models import Model
-    from tensorflow.keras.layers import Input, Embedding, LSTM, Dropout, Dense
-    from src import reddy_tech
-
-    word_to_index, max_len = reddy_tech.init()
-    vocab_len = len(word_to_index) + 1
-    if embedding_shape is None:
-        print('Could not detect embedding shape from weights; aborting model reconstruction.')
-        sys.exit(1)
-    emb_dim = embedding_shape[1]
-    print(f'Building model with vocab_len={vocab_len}, max_len={max_len}, emb_dim={emb_dim}')
-
-    sentence_indices = Input(shape=(max_len,), dtype='int32')
-    embedding_layer = Embedding(input_dim=vocab_len, output_dim=emb_dim, trainable=False)
-    embeddings = embedding_layer(sentence_indices)
-    X = LSTM(128, return_sequences=True)(embeddings)
-    X = Dropout(0.5)(X)
-    X = LSTM(128, return_sequences=False)(X)
-    X = Dropout(0.5)(X)
-
-    # decide output units based on detected dense_out
-    if dense_out is None:
-        print('Could not detect final dense output dimension. Defaulting to 1 (sigmoid).')
-        out_units = 1
-    else:
-        out_units = int(dense_out)
-
-    if out_units == 1:
-        out = Dense(1, activation='sigmoid')(X)
-    else:
-        out = Dense(out_units, activation='softmax')(X)
-
-    model = Model(inputs=sentence_indices, outputs=out)
-    print('\nModel built. Attempting to load weights...')
-    model.load_weights(str(MODEL_PATH))
+    print('\nBuilding model and loading weights...')
+    model = reconstruct_from_weights(MODEL_PATH)
     print('Weights loaded successfully. Model summary:')
     model.summary()
 except Exception as e:
@@ -0,0 +1,132 @@
+"""Pure-NumPy inference for the Embedding -> LSTM -> LSTM -> Dense text model.
+
+`export_npz()` walks a loaded Keras model once and writes its weights plus a
+small layer spec to an .npz file. `NumpyLSTM.load()` reads that file back and
+serves `predict(X)` with plain NumPy, so workers never import TensorFlow.
+"""
+import json
+
+import numpy as np
+
+
+def _sigmoid(x):
+    # tanh form avoids overflow warnings from exp() on large negative inputs
+    return 0.5 * (np.tanh(0.5 * x) + 1.0)
+
+def _softmax(x):
+    e = np.exp(x - x.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'tanh': np.tanh,
+    'sigmoid': _sigmoid,
+    'relu': lambda x: np.maximum(x, 0),
+    'softmax': _softmax,
+}
+
+def _activation_name(activation):
+    name = activation if isinstance(activation, str) else getattr(activation, '__name__', str(activation))
+    if name not in ACTIVATIONS:
+        raise ValueError(f'Unsupported activation for NumPy export: {name}')
+    return name
+
+def export_npz(model, path):
+    """Write the weights and layer spec of a Keras text model to `path`."""
+    spec = []
+    arrays = {}
+    for layer in model.layers:
+        kind = layer.__class__.__name__
+        config = layer.get_config()
+        weights = layer.get_weights()
+        n = len(spec)
+        if kind == 'InputLayer':
+            continue
+        if kind == 'Dropout':
+            continue
+        if kind == 'Embedding':
+            if config.get('mask_zero'):
+                raise ValueError('Embedding layers with mask_zero are not supported')
+            arrays[f'{n}_embeddings'] = weights[0].astype(np.float32)
+            spec.append({'type': 'embedding'})
+        elif kind == 'LSTM':
+            if config.get('go_backwards') or config.get('stateful') or not config.get('use_bias', True):
+                raise ValueError(f'Unsupported LSTM configuration in layer {layer.name}')
+            kernel, recurrent, bias = weights
+            arrays[f'{n}_kernel'] = kernel.astype(np.float32)
+            arrays[f'{n}_recurrent'] = recurrent.astype(np.float32)
+            arrays[f'{n}_bias'] = bias.astype(np.float32)
+            spec.append({
+                'type': 'lstm',
+                'units': int(config['units']),
+                'activation': _activation_name(config['activation']),
+                'recurrent_activation': _activation_name(config['recurrent_activation']),
+                'return_sequences': bool(config['return_sequences']),
+            })
+        elif kind == 'Dense':
+            arrays[f'{n}_kernel'] = weights[0].astype(np.float32)
+            arrays[f'{n}_bias'] = (weights[1] if len(weights) > 1 else np.zeros(weights[0].shape[1])).astype(np.float32)
+            spec.append({'type': 'dense', 'activation': _activation_name(config['activation'])})
+        elif kind == 'Activation':
+            spec.append({'type': 'activation', 'activation': _activation_name(config['activation'])})
+        else:
+            raise ValueError(f'Unsupported layer for NumPy export: {kind} ({layer.name})')
+    max_len = int(model.inputs[0].shape[1])
+    np.savez(path, spec=np.array(json.dumps({'max_len': max_len, 'layers': spec})), **arrays)
+
+
+class NumpyLSTM:
+    """Batched NumPy forward pass with the same `predict(X)` contract as Keras."""
+
+    def __init__(self, spec, arrays):
+        self.max_len = spec['max_len']
+        self.layers = []
+        for n, layer in enumerate(spec['layers']):
+            weights = {name.split('_', 1)[1]: arrays[name] for name in arrays if name.split('_', 1)[0] == str(n)}
+            self.layers.append((layer, weights))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(str(path), allow_pickle=False) as data:
+            spec = json.loads(str(data['spec']))
+            arrays = {name: data[name] for name in data.files if name != 'spec'}
+        return cls(spec, arrays)
+
+    def predict(self, X, verbose=0):
+        x = np.asarray(X)
+        for layer, weights in self.layers:
+            kind = layer['type']
+            if kind == 'embedding':
+                x = weights['embeddings'][x.astype(np.intp)]
+            elif kind == 'lstm':
+                x = self._lstm(x, weights, layer)
+            elif kind == 'dense':
+                x = ACTIVATIONS[layer['activation']](x @ weights['kernel'] + weights['bias'])
+            else:
+                x = ACTIVATIONS[layer['activation']](x)
+        return x
+
+    @staticmethod
+    def _lstm(x, weights, layer):
+        units = layer['units']
+        act = ACTIVATIONS[layer['activation']]
+        rec_act = ACTIVATIONS[layer['recurrent_activation']]
+        recurrent = weights['recurrent']
+        n, steps, _ = x.shape
+        # Input projections for every timestep in one matmul; only h @ U is sequential
+        xz = x @ weights['kernel'] + weights['bias']
+        h = np.zeros((n, units), dtype=np.float32)
+        c = np.zeros((n, units), dtype=np.float32)
+        outputs = np.empty((n, steps, units), dtype=np.float32) if layer['return_sequences'] else None
+        # Keras gate order: input, forget, cell candidate, output
+        for t in range(steps):
+            z = xz[:, t] + h @ recurrent
+            i = rec_act(z[:, :units])
+            f = rec_act(z[:, units:2 * units])
+            g = act(z[:, 2 * units:3 * units])
+            o = rec_act(z[:, 3 * units:])
+            c = f * c + i * g
+            h = o * act(c)
+            if outputs is not None:
+                outputs[:, t] = h
+        return outputs if outputs is not None else h
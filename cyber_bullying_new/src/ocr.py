@@ -0,0 +1,261 @@
+"""OCR for uploaded images and a bounded background queue for /detect.
+
+`run_ocr()` is what a worker process executes: decode the image (uploaded
+bytes or a file), convert it to grayscale, cut it down to its text regions
+(src/text_regions.py) and pass it to the OCR backend (src/ocr_backends.py),
+unless the same pixels were already recognized with the same settings
+(OCRCache) or a near-duplicate of the image was (src/image_hash.py).
+`OCRJobQueue` runs it on a process pool so the request only has to enqueue
+the job, then finishes each job (scoring, database writes) on a finisher
+thread in the web process where the text model lives.
+"""
+import io
+import itertools
+import multiprocessing
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+import config as app_config
+from src.caching import OCRCache
+from src.image_hash import get_hash_index, image_key, namespace
+from src.ocr_backends import get_ocr_backend
+
+_ocr_cache = None
+# Part of the cache key; bump when src/text_regions.py changes what Tesseract is given
+TEXT_REGIONS_VERSION = 2
+
+
+def get_ocr_modules():
+    """Import OpenCV and pytesseract, pointing pytesseract at TESSERACT_CMD if set."""
+    import cv2
+    import pytesseract
+    #  Mention the installed location of Tesseract-OCR in your system (configurable)
+    # Only set tesseract command if provided in config; otherwise rely on PATH
+    if getattr(app_config, 'TESSERACT_CMD', None):
+        pytesseract.pytesseract.tesseract_cmd = app_config.TESSERACT_CMD
+    return cv2, pytesseract
+
+def get_ocr_cache():
+    # One per worker process; they share the SQLite file
+    global _ocr_cache
+    if _ocr_cache is None:
+        _ocr_cache = OCRCache(app_config.OCR_CACHE_SIZE, app_config.OCR_CACHE_DB, app_config.OCR_CACHE_DB_ENTRIES)
+    return _ocr_cache
+
+def ocr_settings():
+    return '\0'.join(str(v) for v in (get_ocr_backend().name, app_config.OCR_LANG, app_config.OCR_TESSERACT_CONFIG,
+                                      app_config.OCR_TEXT_REGIONS, app_config.OCR_MIN_SIDE, app_config.OCR_MAX_SIDE,
+                                      TEXT_REGIONS_VERSION))
+
+def preprocess(gray):
+    """Image to hand to Tesseract."""
+    if app_config.OCR_TEXT_REGIONS == 'off':
+        return gray
+    from src.text_regions import prepare_for_ocr
+    return prepare_for_ocr(gray, app_config.OCR_MIN_SIDE, app_config.OCR_MAX_SIDE, app_config.OCR_TEXT_REGIONS)
+
+def _is_bytes(source):
+    return isinstance(source, (bytes, bytearray, memoryview))
+
+def image_size(source):
+    """(width, height) read from the image header without decoding the pixels.
+
+    `source` is the encoded image bytes or a file path.
+    """
+    from PIL import Image
+    with Image.open(io.BytesIO(source) if _is_bytes(source) else source) as image:
+        return image.size
+
+def decode_image(cv2, source):
+    """BGR array from encoded bytes (no copy into a file) or a path; None if undecodable."""
+    if _is_bytes(source):
+        return cv2.imdecode(np.frombuffer(memoryview(source), dtype=np.uint8), cv2.IMREAD_COLOR)
+    return cv2.imread(str(source))
+
+def run_ocr(source):
+    """Recognize the text in `source`, encoded image bytes or a file path.
+
+    Returns {'text', 'cached', 'near_duplicate', 'started', 'timings'};
+    raises ValueError if the image cannot be decoded.
+    """
+    started = time.time()
+    import cv2
+    # Created (and the language model loaded) on the first job in this process
+    backend = get_ocr_backend()
+    t0 = time.perf_counter()
+    image = decode_image(cv2, source)
+    if image is None:
+        name = 'uploaded image' if _is_bytes(source) else source
+        raise ValueError(f'could not decode {name} (file may be corrupt or unreadable)')
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    t1 = time.perf_counter()
+    cache = get_ocr_cache()
+    key = cache.key(gray, ocr_settings())
+    text = cache.get(key)
+    cached = text is not None
+    near_duplicate = False
+    t2 = t1
+    if not cached:
+        # A repost of an image OCR'd before (re-encoded, resized) reuses its text
+        index = get_hash_index() if app_config.OCR_HASH_DISTANCE >= 0 else None
+        if index:
+            ns = namespace('ocr', ocr_settings())
+            image = image_key(gray)
+            text = index.find(ns, image, app_config.OCR_HASH_DISTANCE)
+        near_duplicate = text is not None
+        t2 = time.perf_counter()
+        if not near_duplicate:
+            prepared = preprocess(gray)
+            t2 = time.perf_counter()
+            text = backend.image_to_string(prepared)
+            if index:
+                index.add(ns, image, text)
+        cache.put(key, text)
+    t3 = time.perf_counter()
+    return {'text': text, 'cached': cached, 'near_duplicate': near_duplicate, 'started': started,
+            'timings': {'decode': t1 - t0, 'preprocess': t2 - t1, 'ocr': t3 - t2}}
+
+
+def worker_context():
+    """Start method for OCR worker processes.
+
+    Workers must not be forked from the web process, which already runs
+    TensorFlow and batcher threads and holds SQLite connections. forkserver
+    starts them from a server process that has imported only this module;
+    where it is unavailable (Windows) they are spawned.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+class QueueFull(Exception):
+    pass
+
+
+class OCRJobQueue:
+    """Bounded OCR queue: `submit()` returns a job id or raises QueueFull.
+
+    At most `max_pending` jobs may be queued or running at once. When a
+    job's OCR completes, `finish(job, ocr_result)` runs on a finisher thread
+    and its return value becomes the job's result. Finished jobs are kept
+    for `status()` until `history` newer ones have completed; a job
+    submitted with an `owner` is only shown to that owner. A job's status is
+    'queued', then 'running' once it has been handed to a worker process,
+    then 'done' or 'failed'.
+    """
+
+    STAGES = ('queue_wait', 'decode', 'preprocess', 'ocr', 'finish')
+
+    def __init__(self, finish, workers=2, max_pending=16, history=1000):
+        self.finish = finish
+        self.workers = workers
+        self.max_pending = max_pending
+        self.history = history
+        self._pool = None
+        self._finisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ocr-finish')
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._pending = 0
+        self._ids = itertools.count(1)
+        self.counts = {'submitted': 0, 'rejected': 0, 'done': 0, 'failed': 0, 'cache_hits': 0, 'cache_misses': 0,
+                       'near_duplicates': 0}
+        self._stage_totals = dict.fromkeys(self.STAGES, 0.0)
+        self._stage_counts = dict.fromkeys(self.STAGES, 0)
+
+    def submit(self, source, owner=None, **context):
+        """Queue OCR of `source` (bytes or path); `context` is stored on the job for `finish`."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.counts['rejected'] += 1
+                raise QueueFull(f'{self._pending} OCR jobs already pending')
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=worker_context())
+            job_id = f'{next(self._ids)}-{uuid.uuid4().hex[:8]}'
+            job = {'id': job_id, 'status': 'queued', 'submitted': time.time(),
+                   'owner': owner, 'context': context, 'timings': {}}
+            self._jobs[job_id] = job
+            self._pending += 1
+            self.counts['submitted'] += 1
+            pool = self._pool
+        try:
+            future = pool.submit(run_ocr, source)
+        except Exception as e:
+            # The job never reached a worker: it fails now and frees its slot
+            print('OCR job', job_id, 'failed:', e)
+            self._end_job(job, pool, 'failed', None, str(e), {}, isinstance(e, BrokenProcessPool))
+            return job_id
+        job['future'] = future
+        future.add_done_callback(lambda f: self._finisher.submit(self._complete, job, f, pool))
+        return job_id
+
+    def status(self, job_id, owner=None):
+        """Public view of a job (no context), or None if unknown, expired or not `owner`'s."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['owner'] != owner:
+                return None
+            view = {k: v for k, v in job.items() if k not in ('owner', 'context', 'future')}
+            future = job.get('future')
+        if view['status'] == 'queued' and future is not None and future.running():
+            view['status'] = 'running'
+        return view
+
+    def stats(self):
+        with self._lock:
+            lookups = self.counts['cache_hits'] + self.counts['cache_misses']
+            return dict(self.counts,
+                        cache_hit_rate=self.counts['cache_hits'] / lookups if lookups else 0.0,
+                        pending=self._pending,
+                        max_pending=self.max_pending,
+                        workers=self.workers,
+                        mean_stage_seconds={stage: total / self._stage_counts[stage] if self._stage_counts[stage] else 0.0
+                                            for stage, total in self._stage_totals.items()})
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+        self._finisher.shutdown()
+
+    def _complete(self, job, future, pool):
+        timings, broken = {}, False
+        try:
+            ocr = future.result()
+            with self._lock:
+                self.counts['cache_hits' if ocr['cached'] else 'cache_misses'] += 1
+                self.counts['near_duplicates'] += ocr['near_duplicate']
+            timings['queue_wait'] = ocr['started'] - job['submitted']
+            timings.update(ocr['timings'])
+            t0 = time.perf_counter()
+            result = self.finish(job, ocr)
+            timings['finish'] = time.perf_counter() - t0
+            status, error = 'done', None
+        except Exception as e:
+            print('OCR job', job['id'], 'failed:', e)
+            result, status, error, broken = None, 'failed', str(e), isinstance(e, BrokenProcessPool)
+        self._end_job(job, pool, status, result, error, timings, broken)
+
+    def _end_job(self, job, pool, status, result, error, timings, broken):
+        with self._lock:
+            if broken and self._pool is pool:
+                # A worker died and the pool accepts no more jobs; the next submit starts a new one
+                self._pool = None
+            job.pop('future', None)
+            job.update(status=status, result=result, error=error, timings=timings, finished=time.time())
+            self._pending -= 1
+            self.counts[status] += 1
+            for stage, seconds in timings.items():
+                self._stage_totals[stage] += seconds
+                self._stage_counts[stage] += 1
+            self._jobs.move_to_end(job['id'])
+            finished = [j for j in self._jobs.values() if j['status'] in ('done', 'failed')]
+            for old in finished[:max(0, len(finished) - self.history)]:
+                del self._jobs[old['id']]
@@ -0,0 +1,106 @@
+"""Interchangeable OCR engines behind `image_to_string(gray) -> str`.
+
+- 'subprocess': pytesseract, which starts a tesseract process, writes temp
+  files and reloads the language model for every image.
+- 'tesserocr': libtesseract through tesserocr. The API handle, and with it
+  the loaded language model, is created once per process and reused.
+- 'fake': returns OCR_FAKE_TEXT without looking at the image, for tests.
+- 'auto': tesserocr when it is installed, otherwise subprocess.
+
+tools/bench_ocr_backends.py compares their throughput.
+"""
+import shlex
+
+import numpy as np
+
+import config as app_config
+
+_backend = None
+
+
+class SubprocessOCR:
+    name = 'subprocess'
+
+    def __init__(self, lang='eng', config=''):
+        from src.ocr import get_ocr_modules
+        _, self.pytesseract = get_ocr_modules()
+        self.lang = lang
+        self.config = config
+
+    def image_to_string(self, gray):
+        return self.pytesseract.image_to_string(gray, lang=self.lang, config=self.config)
+
+
+class TesserocrOCR:
+    name = 'tesserocr'
+
+    def __init__(self, lang='eng', config='', tessdata=''):
+        import tesserocr
+        options = self._parse_config(config)
+        kwargs = {'lang': lang}
+        if tessdata:
+            kwargs['path'] = tessdata
+        if 'psm' in options:
+            kwargs['psm'] = int(options.pop('psm'))
+        if 'oem' in options:
+            kwargs['oem'] = int(options.pop('oem'))
+        self.api = tesserocr.PyTessBaseAPI(**kwargs)
+        for name, value in options.items():
+            self.api.SetVariable(name, value)
+
+    @staticmethod
+    def _parse_config(config):
+        """Map tesseract CLI options (--psm N, --oem N, -c name=value) to a dict."""
+        options = {}
+        args = shlex.split(config)
+        i = 0
+        while i < len(args):
+            if args[i] in ('--psm', '--oem') and i + 1 < len(args):
+                options[args[i][2:]] = args[i + 1]
+                i += 2
+            elif args[i] == '-c' and i + 1 < len(args) and '=' in args[i + 1]:
+                name, value = args[i + 1].split('=', 1)
+                options[name] = value
+                i += 2
+            else:
+                raise ValueError(f'Unsupported tesseract option for tesserocr: {args[i]}')
+        return options
+
+    def image_to_string(self, gray):
+        gray = np.ascontiguousarray(gray, dtype=np.uint8)
+        height, width = gray.shape
+        self.api.SetImageBytes(gray.tobytes(), width, height, 1, width)
+        return self.api.GetUTF8Text()
+
+
+class FakeOCR:
+    name = 'fake'
+
+    def __init__(self, text=''):
+        self.text = text
+
+    def image_to_string(self, gray):
+        return self.text
+
+
+def create_backend(name):
+    if name == 'auto':
+        try:
+            import tesserocr  # noqa: F401
+            name = 'tesserocr'
+        except ImportError:
+            name = 'subprocess'
+    if name == 'subprocess':
+        return SubprocessOCR(app_config.OCR_LANG, app_config.OCR_TESSERACT_CONFIG)
+    if name == 'tesserocr':
+        return TesserocrOCR(app_config.OCR_LANG, app_config.OCR_TESSERACT_CONFIG, app_config.OCR_TESSDATA)
+    if name == 'fake':
+        return FakeOCR(app_config.OCR_FAKE_TEXT)
+    raise ValueError(f"Unknown OCR backend {name!r}; expected 'auto', 'subprocess', 'tesserocr' or 'fake'")
+
+def get_ocr_backend():
+    """The configured backend, created once per process."""
+    global _backend
+    if _backend is None:
+        _backend = create_backend(app_config.OCR_BACKEND)
+    return _backend
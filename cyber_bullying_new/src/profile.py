@@ -2,17 +2,58 @@
 from flask import Blueprint, request, render_template, redirect, jsonify, session
 from werkzeug.utils import secure_filename
 from cs50 import SQL
+import json
 import os
 from src.auth import login_required
 from src.helpers import error, UserInfo
+from src.caching import ImageResultCache
+from src.image_hash import get_hash_index, image_key, namespace
+import config as app_config
 from flask import *
 import os
 from werkzeug.utils import secure_filename
-import label_image
 
-def load_image(image):
-    text = label_image.main(image)
-    return text
+_image_cache = None
+
+def get_image_cache(fingerprint):
+    global _image_cache
+    if _image_cache is None or _image_cache.fingerprint != fingerprint:
+        _image_cache = ImageResultCache(fingerprint, app_config.IMAGE_CACHE_SIZE,
+                                        app_config.IMAGE_CACHE_DB, app_config.IMAGE_CACHE_DB_ENTRIES)
+    return _image_cache
+
+def classify_image(data):
+    """{label: probability} for encoded image bytes.
+
+    Identical uploads come from the digest-keyed cache and near-duplicates
+    from the perceptual hash index; only new images reach the model.
+    """
+    # label_image pulls in TensorFlow; import it only when /image is used
+    import label_image
+    # The graph and session are loaded once and reused across requests
+    classifier = label_image.get_classifier()
+    cache = get_image_cache(classifier.fingerprint)
+    key = cache.key(data)
+    probabilities = cache.get_probabilities(key)
+    if probabilities is None:
+        import cv2
+        image = label_image.decode_bgr(data)
+        # A re-encoded or resized repost reuses the result of the earlier image
+        # (opt-in, see IMAGE_HASH_DISTANCE)
+        index = get_hash_index() if app_config.IMAGE_HASH_DISTANCE >= 0 else None
+        found = None
+        if index:
+            ns = namespace('image', classifier.fingerprint)
+            image_hash = image_key(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY))
+            found = index.find(ns, image_hash, app_config.IMAGE_HASH_DISTANCE)
+        if found is not None:
+            probabilities = json.loads(found)
+        else:
+            probabilities = classifier.classify(image)
+            if index:
+                index.add(ns, image_hash, json.dumps(probabilities))
+        cache.put_probabilities(key, probabilities)
+    return probabilities
 
 profile = Blueprint("profile", __name__, static_folder="static", template_folder="templates")
 db = SQL("sqlite:///src/main.db")
@@ -95,21 +136,29 @@ def Remove(Id):
     db.execute("DELETE FROM :tablename WHERE id = :id", tablename=userInfo['username'], id=Id)
     return redirect("/me")
 
+@profile.route('/image_stats')
+@login_required
+def image_stats():
+    index = get_hash_index()
+    return jsonify({'cache': _image_cache.stats() if _image_cache else {},
+                    'near_duplicates': index.stats() if index else {}})
+
 @profile.route("/image", methods=["GET", "POST"])
 @login_required
 def image():
     if request.method == "POST":
         f = request.files['file']
         file_path = secure_filename(f.filename)
-        f.save(file_path)
         print(file_path)
-        result = load_image(file_path)
+        # Classified from memory: nothing is written, so concurrent uploads
+        # with the same filename cannot overwrite each other
+        probabilities = classify_image(f.read())
+        result = max(probabilities, key=probabilities.get)
         result = result.title()
         d = {"Fake":" → Detected Image contains Fake Content, Keep Safe",
         "Original":" → Detected Image was Normal, No Problem"}
         result = result+d[result]  
         print(result)
-        os.remove(file_path)
         userInfo, dp = UserInfo(db)
         get_posts = db.execute("SELECT * FROM :tablename", tablename=userInfo['username'])
         if get_posts:
@@ -1,28 +1,37 @@
-
-
 import pickle
-import pandas as pd
 import numpy as np
+import re
 import string
+from functools import lru_cache
 
 import nltk
-# Comment out these statements if your packages are already up-to-date!
-nltk.download('stopwords')
-nltk.download('punkt')
-nltk.download('averaged_perceptron_tagger')
-nltk.download('wordnet')
-# ------------------------ #
+import config as app_config
+
+def ensure_nltk_data(data_dir=None, offline=None):
+    """Make NLTK look in the vendored data directory first.
+
+    Missing resources are downloaded into `data_dir` unless running offline,
+    in which case nothing touches the network and a missing resource fails
+    on first use instead. Resources that are already present are never
+    re-downloaded.
+    """
+    data_dir = data_dir or getattr(app_config, 'NLTK_DATA_DIR', None)
+    offline = getattr(app_config, 'NLTK_OFFLINE', False) if offline is None else offline
+    if data_dir and data_dir not in nltk.data.path:
+        nltk.data.path.insert(0, data_dir)
+    if offline:
+        return
+    for name, resource in app_config.NLTK_RESOURCES:
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            nltk.download(name, download_dir=data_dir, quiet=True)
+
+ensure_nltk_data()
 from nltk.stem import WordNetLemmatizer
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
 
-from keras.models import Model
-from keras.layers import Dense, Input, Dropout, LSTM, Activation
-##from tensorflow.keras.layers.embeddings import Embedding
-from tensorflow.keras.layers import Embedding
-from keras.preprocessing import sequence
-from keras.initializers import glorot_uniform
-
 lemmatizer = WordNetLemmatizer()
 stop_words = set(stopwords.words('english'))
 stop_words.update(list(string.punctuation))
@@ -44,30 +53,89 @@ def init():
     print(len(word_to_index))
     return word_to_index, max_len
 
-def clean_text(review) :
-    global max_len
+# Tokenizer used by clean_text: 'nltk' (word_tokenize) or 'regex' (fast path below)
+TOKENIZER = getattr(app_config, 'TEXT_TOKENIZER', 'nltk')
+# Stop-word filtering and lemmatization are memoized per lowercased word
+LEMMA_CACHE_SIZE = getattr(app_config, 'LEMMA_CACHE_SIZE', 50000)
+
+@lru_cache(maxsize=LEMMA_CACHE_SIZE)
+def _clean_word(word_lower):
+    """Return the lemma of a lowercased word, or None if it is a stop word."""
+    if word_lower in stop_words:
+        return None
+    # Simple lemmatization without POS tagging to avoid wordnet corpus issues
+    return lemmatizer.lemmatize(word_lower)
+
+# Regex tokenizer: reproduces NLTKWordTokenizer's splitting rules with one
+# padding pass over the text plus a memoized per-token clitic/period split.
+_PAD_RE = re.compile(r'\.{2,}|--|`+|[;@#$%&?!*()\[\]{}<>"«»“”‘’„\u2012-\u2015]|[:,](?!\d)')
+_CONTRACTION_RE = re.compile(r"(?i)^(can)(not)$|^(d)('ye)$|^(gim)(me)$|^(gon)(na)$|^(got)(ta)$|^(lem)(me)$|^(more)('n)$|^(wan)(na)$")
+_CLITIC_RE = re.compile(r"^(.*[^' ])('[sS]|'[mM]|'[dD]|'ll|'LL|'re|'RE|'ve|'VE|n't|N'T|')$")
+_OPEN_QUOTE_RE = re.compile(r"(?i)^(')(?!(?:re|ve|ll|m|t|s|d|n)\b)(?=\w)(.+)$")
+
+def _pad(match):
+    token = match.group(0)
+    if token == '"':
+        # Opening double quotes become `` and closing ones '' like NLTK
+        start = match.start()
+        if start == 0 or match.string[start - 1] in ' \t\n\r\f\v([{<':
+            return ' `` '
+        return " '' "
+    return ' ' + token + ' '
+
+@lru_cache(maxsize=LEMMA_CACHE_SIZE)
+def _split_token(token):
+    out = []
+    quoted = _OPEN_QUOTE_RE.match(token)
+    if quoted:
+        out.append(quoted.group(1))
+        token = quoted.group(2)
+    tail = []
+    # Sentence-final period (word_tokenize sees each sentence separately)
+    if len(token) > 1 and token[-1] == '.' and token[-2] != '.':
+        token, tail = token[:-1], ['.']
+    clitic = _CLITIC_RE.match(token)
+    if clitic:
+        token, tail = clitic.group(1), [clitic.group(2)] + tail
+    contraction = _CONTRACTION_RE.match(token)
+    if contraction:
+        out.extend(part for part in contraction.groups() if part)
+    else:
+        out.append(token)
+    return tuple(out + tail)
+
+def regex_tokenize(text):
+    """Fast approximation of `word_tokenize` without sentence splitting."""
+    tokens = []
+    for token in _PAD_RE.sub(_pad, text).split():
+        tokens.extend(_split_token(token))
+    return tokens
+
+_TOKENIZERS = {'nltk': word_tokenize, 'regex': regex_tokenize}
+
+def clean_text(review, tokenizer=None):
     if not review or not isinstance(review, str):
         return ""
+    tokenize = _TOKENIZERS[tokenizer or TOKENIZER]
     try:
-        words = word_tokenize(review)
         output_words = []
-        for word in words :
-            word_lower = word.lower()
-            if word_lower not in stop_words :
-                # Simple lemmatization without POS tagging to avoid wordnet corpus issues
-                clean_word = lemmatizer.lemmatize(word_lower)
+        for word in tokenize(review):
+            clean_word = _clean_word(word.lower())
+            if clean_word is not None:
                 output_words.append(clean_word)
-        max_len = max(max_len, len(output_words))
         return " ".join(output_words)
     except Exception as e:
         print(f'Error in clean_text: {e}')
         # Fallback: return lowercased words without lemmatization if error occurs
         try:
-            words = word_tokenize(review)
+            words = tokenize(review)
             return " ".join([w.lower() for w in words if w.lower() not in stop_words])
         except:
             return review.lower()
-    return " ".join(output_words)
+
+def clean_texts(reviews, tokenizer=None):
+    """Clean an iterable of posts, returning the cleaned strings in order."""
+    return [clean_text(review, tokenizer) for review in reviews]
 
 def read_glove_vecs(glove_file):
     with open(glove_file, 'r', encoding="utf8") as file:
@@ -85,13 +153,89 @@ def read_glove_vecs(glove_file):
     return word_to_index, index_to_word, word_to_vec_map
 
 def sentences_to_indices(X, word_to_index, max_len):
+    return encode_sentences(X, word_to_index, max_len)
+
+TRUNCATE_POLICIES = ('head', 'tail', 'both')
+PADDING_POLICIES = ('post', 'pre')
+# Below this many sentences a plain per-row fill beats the vectorized scatter
+ROW_LOOP_MAX = 32
+
+def _truncate(ids, max_len, keep):
+    if keep == 'head':
+        return ids[:max_len]
+    if keep == 'tail':
+        return ids[len(ids) - max_len:]
+    head = (max_len + 1) // 2
+    return ids[:head] + ids[len(ids) - (max_len - head):]
+
+def encode_sentences(X, word_to_index, max_len, out=None, keep='head', padding='post'):
+    """Encode cleaned sentences into an int32 (len(X), max_len) index matrix.
+
+    Words missing from `word_to_index` map to 0 but still take up a position,
+    exactly like the notebook's `sentences_to_indices`. Sentences longer than
+    `max_len` are truncated according to `keep`: 'head' keeps the first
+    `max_len` words, 'tail' the last ones and 'both' keeps the first and last
+    halves, dropping the middle. `padding='post'` left-aligns the ids and pads
+    with zeros on the right (the layout the model was trained on); 'pre' pads
+    on the left instead.
+
+    Pass a preallocated int32 array with at least len(X) rows and `max_len`
+    columns as `out` to reuse it across calls; the filled `out[:len(X)]` view
+    is returned.
+    """
+    if keep not in TRUNCATE_POLICIES:
+        raise ValueError(f'keep must be one of {TRUNCATE_POLICIES}, got {keep!r}')
+    if padding not in PADDING_POLICIES:
+        raise ValueError(f'padding must be one of {PADDING_POLICIES}, got {padding!r}')
     m = len(X)
-    X_indices = np.zeros((m, max_len))
-    for i in range(m):
-        sentence_words = [w.lower() for w in X[i].split()]
-        j = 0
-        for word in sentence_words:
-            if word in word_to_index:
-                X_indices[i, j] = word_to_index[word]
-            j += 1
-    return X_indices
+    if out is None:
+        out = np.zeros((m, max_len), dtype=np.int32)
+    else:
+        if out.dtype != np.int32 or out.ndim != 2 or out.shape[0] < m or out.shape[1] != max_len:
+            raise ValueError(f'out must be an int32 array of shape (>={m}, {max_len}), got {out.dtype} {out.shape}')
+        out = out[:m]
+        out.fill(0)
+    if m == 0 or max_len == 0:
+        return out
+
+    get = word_to_index.get
+    if m <= ROW_LOOP_MAX:
+        for i, sentence in enumerate(X):
+            ids = [get(word, 0) for word in sentence.lower().split()]
+            if len(ids) > max_len:
+                ids = _truncate(ids, max_len, keep)
+            if not ids:
+                continue
+            if padding == 'post':
+                out[i, :len(ids)] = ids
+            else:
+                out[i, max_len - len(ids):] = ids
+        return out
+
+    tokens = [sentence.lower().split() for sentence in X]
+    lengths = np.fromiter((len(words) for words in tokens), dtype=np.intp, count=m)
+    total = int(lengths.sum())
+    if total == 0:
+        return out
+    ids = np.fromiter((get(word, 0) for words in tokens for word in words), dtype=np.int32, count=total)
+
+    # Row and in-sentence position of every token, then the column it lands in
+    rows = np.repeat(np.arange(m), lengths)
+    starts = np.cumsum(lengths) - lengths
+    pos = np.arange(total) - np.repeat(starts, lengths)
+    token_len = lengths[rows]
+    overflow = np.maximum(token_len - max_len, 0)
+    if keep == 'head':
+        kept = pos < max_len
+        cols = pos
+    elif keep == 'tail':
+        kept = pos >= overflow
+        cols = pos - overflow
+    else:
+        head = (max_len + 1) // 2
+        kept = (pos < head) | (pos >= head + overflow)
+        cols = np.where(pos < head, pos, pos - overflow)
+    if padding == 'pre':
+        cols = cols + (max_len - np.minimum(token_len, max_len))
+    out[rows[kept], cols[kept]] = ids[kept]
+    return out
@@ -1,15 +1,23 @@
 from pathlib import Path
-import h5py
+import hashlib
+import time
 import traceback
 
 MODEL_FULL = Path('src/LSTM_full.h5')
 MODEL_WEIGHTS = Path('src/LSTM.h5')
+VOCAB_FILE = Path('src/word_to_index.pkl')
+MODEL_NPZ = Path('src/LSTM.npz')
+MODEL_TFLITE = Path('src/LSTM.tflite')
 
 _model = None
+_model_path = None
 _vocab = None
+_fingerprint = None
+_inference_fingerprints = {}
 
 def _inspect_weights(path):
     """Return guessed (embedding_shape, final_dense_out) from weights file."""
+    import h5py
     with h5py.File(str(path), 'r') as f:
         if 'model_weights' not in f:
             return None, None
@@ -28,15 +36,102 @@ def _inspect_weights(path):
                 dense_out = shape[1]
     return embedding_shape, dense_out
 
+def _h5_attrs(path):
+    import h5py
+    with h5py.File(str(path), 'r') as f:
+        return dict(f.attrs)
+
+def build_text_model(vocab_len, max_len, emb_dim, out_units=1):
+    """Build the notebook architecture: Embedding -> LSTM -> LSTM -> Dense."""
+    from tensorflow.keras.models import Model
+    from tensorflow.keras.layers import Input, Embedding, LSTM, Dropout, Dense
+
+    sentence_indices = Input(shape=(max_len,), dtype='int32')
+    embedding_layer = Embedding(input_dim=vocab_len, output_dim=emb_dim, trainable=False)
+    embeddings = embedding_layer(sentence_indices)
+    X = LSTM(128, return_sequences=True)(embeddings)
+    X = Dropout(0.5)(X)
+    X = LSTM(128, return_sequences=False)(X)
+    X = Dropout(0.5)(X)
+    if out_units == 1:
+        out = Dense(1, activation='sigmoid')(X)
+    else:
+        out = Dense(out_units, activation='softmax')(X)
+    return Model(inputs=sentence_indices, outputs=out)
+
+def reconstruct_from_weights(path=MODEL_WEIGHTS):
+    """Rebuild the architecture around a weights-only HDF5 file and load it."""
+    word_to_index, max_len = get_vocab()
+    # inspect weights file to guess embedding dim and output units
+    emb_shape, dense_out = _inspect_weights(path)
+    if emb_shape is None:
+        raise RuntimeError(f'Could not detect embedding shape in {path}')
+    out_units = int(dense_out) if dense_out is not None else 1
+    model = build_text_model(len(word_to_index) + 1, max_len, int(emb_shape[1]), out_units)
+    model.load_weights(str(path))
+    return model
+
+def read_artifact_metadata(path=MODEL_FULL):
+    """Return the serving metadata of a prebuilt artifact, or None if it has none."""
+    if not path.exists():
+        return None
+    attrs = _h5_attrs(path)
+    if 'serving_fingerprint' not in attrs:
+        return None
+    return {
+        'vocab_size': int(attrs['serving_vocab_size']),
+        'max_len': int(attrs['serving_max_len']),
+        'fingerprint': str(attrs['serving_fingerprint']),
+    }
+
+def build_serving_artifact(path=MODEL_FULL):
+    """Write a full-model .h5 that `load_text_model()` can load in one step.
+
+    The file carries the vocabulary size, max_len and the fingerprint of the
+    weights/vocabulary it was built from as HDF5 attributes.
+    """
+    import h5py
+    from tensorflow.keras.models import load_model
+    if 'model_config' in _h5_attrs(MODEL_WEIGHTS):
+        model = load_model(str(MODEL_WEIGHTS), compile=False)
+    else:
+        model = reconstruct_from_weights(MODEL_WEIGHTS)
+    word_to_index, max_len = get_vocab()
+    model.save(str(path))
+    metadata = {'vocab_size': len(word_to_index) + 1, 'max_len': max_len, 'fingerprint': model_fingerprint()}
+    with h5py.File(str(path), 'a') as f:
+        for key, value in metadata.items():
+            f.attrs['serving_' + key] = value
+    return metadata
+
+def _choose_load_strategy():
+    """Pick how to load the Keras model from what is on disk, without trial loads."""
+    metadata = read_artifact_metadata()
+    if metadata is not None:
+        if not MODEL_WEIGHTS.exists() or metadata['fingerprint'] == model_fingerprint():
+            return 'artifact', MODEL_FULL
+        print(f'Warning: {MODEL_FULL} was built from other weights/vocabulary; '
+              'run tools/build_model_artifact.py to rebuild it')
+    elif MODEL_FULL.exists():
+        return 'full', MODEL_FULL
+    if not MODEL_WEIGHTS.exists():
+        raise RuntimeError(f'No text model found: neither {MODEL_FULL} nor {MODEL_WEIGHTS} exists')
+    if 'model_config' in _h5_attrs(MODEL_WEIGHTS):
+        return 'full', MODEL_WEIGHTS
+    return 'reconstruct', MODEL_WEIGHTS
+
 def load_text_model():
     """Load and return a Keras model for text classification.
 
-    Strategy:
-    - If `src/LSTM_full.h5` exists, load it with `load_model` (contains architecture+weights).
-    - Else, try `load_model` on `src/LSTM.h5` (may fail if weights-only).
-    - Else, reconstruct architecture (based on notebook) and load weights from `src/LSTM.h5`.
+    Strategy (decided up front from the files on disk; load time is logged):
+    - 'artifact': `src/LSTM_full.h5` built by tools/build_model_artifact.py, when
+      its recorded fingerprint matches the current weights and vocabulary.
+    - 'full': a full model file without serving metadata (`src/LSTM_full.h5`,
+      or `src/LSTM.h5` if it was saved with its architecture).
+    - 'reconstruct': rebuild the notebook architecture and load the weights-only
+      `src/LSTM.h5` into it.
     """
-    global _model
+    global _model, _model_path
     if _model is not None:
         return _model
 
@@ -45,63 +140,64 @@ def load_text_model():
     except Exception as e:
         raise RuntimeError('TensorFlow/Keras is required to load the model: ' + str(e))
 
-    # Preferred: full model file
-    try:
-        if MODEL_FULL.exists():
-            _model = load_model(str(MODEL_FULL))
-            return _model
-    except Exception:
-        print('Failed to load full model, trying fallback...')
-        traceback.print_exc()
-
-    # Try loading weights-containing file directly (may be full model or weights-only)
-    try:
-        if MODEL_WEIGHTS.exists():
-            # Attempt to load as full model first
-            try:
-                _model = load_model(str(MODEL_WEIGHTS))
-                return _model
-            except Exception:
-                # Will attempt reconstruct + load_weights
-                pass
-    except Exception:
-        traceback.print_exc()
-
-    # Reconstruct architecture and load weights
-    try:
-        # lazy-import reddy_tech to get vocab and max_len
-        from src import reddy_tech
-        word_to_index, max_len = reddy_tech.init()
-        vocab_len = len(word_to_index) + 1
-
-        # inspect weights file to guess embedding dim and output units
-        emb_shape, dense_out = _inspect_weights(MODEL_WEIGHTS)
-        if emb_shape is None:
-            raise RuntimeError('Could not detect embedding shape in weights file')
-        emb_dim = int(emb_shape[1])
-        out_units = int(dense_out) if dense_out is not None else 1
-
-        from tensorflow.keras.models import Model
-        from tensorflow.keras.layers import Input, Embedding, LSTM, Dropout, Dense
-
-        sentence_indices = Input(shape=(max_len,), dtype='int32')
-        embedding_layer = Embedding(input_dim=vocab_len, output_dim=emb_dim, trainable=False)
-        embeddings = embedding_layer(sentence_indices)
-        X = LSTM(128, return_sequences=True)(embeddings)
-        X = Dropout(0.5)(X)
-        X = LSTM(128, return_sequences=False)(X)
-        X = Dropout(0.5)(X)
-        if out_units == 1:
-            out = Dense(1, activation='sigmoid')(X)
-        else:
-            out = Dense(out_units, activation='softmax')(X)
-        model = Model(inputs=sentence_indices, outputs=out)
-        model.load_weights(str(MODEL_WEIGHTS))
-        _model = model
-        return _model
-    except Exception as e:
-        traceback.print_exc()
-        raise RuntimeError('Failed to reconstruct/load weights: ' + str(e))
+    strategy, path = _choose_load_strategy()
+    start = time.perf_counter()
+    if strategy == 'reconstruct':
+        try:
+            model = reconstruct_from_weights(path)
+        except Exception as e:
+            traceback.print_exc()
+            raise RuntimeError('Failed to reconstruct/load weights: ' + str(e))
+    else:
+        model = load_model(str(path), compile=False)
+    print(f'Loaded text model from {path} via {strategy!r} in {time.perf_counter() - start:.2f}s')
+    _model, _model_path = model, path
+    return _model
+
+def variable_length_model(model):
+    """Return a Keras model sharing `model`'s layers but accepting any sequence length."""
+    from tensorflow.keras.models import Model
+    from tensorflow.keras.layers import Input
+    inputs = Input(shape=(None,), dtype='int32')
+    X = inputs
+    for layer in model.layers:
+        if layer.__class__.__name__ != 'InputLayer':
+            X = layer(X)
+    return Model(inputs=inputs, outputs=X)
+
+def load_inference_model(backend='keras', buckets=None):
+    """Return a model exposing Keras-style `predict(X)` for the given backend.
+
+    With `buckets` (e.g. (8, 16)) rows are scored at the shortest bucket length
+    that fits them instead of all max_len steps; see `batcher.BucketedModel`.
+
+    - 'keras': the full Keras model from `load_text_model()`.
+    - 'numpy': the NumPy engine reading `src/LSTM.npz` (see tools/export_numpy_model.py);
+      TensorFlow is never imported.
+    - 'tflite': the (optionally quantized) artifact `src/LSTM.tflite` written by
+      tools/export_tflite.py.
+    """
+    if buckets:
+        from src.batcher import BucketedModel
+        if backend == 'tflite':
+            raise ValueError('Length buckets need a variable-length model; the tflite backend has a fixed shape')
+        model = load_inference_model(backend)
+        if backend == 'keras':
+            model = variable_length_model(model)
+        return BucketedModel(model, buckets)
+    if backend == 'keras':
+        return load_text_model()
+    if backend == 'numpy':
+        from src.numpy_lstm import NumpyLSTM
+        if not MODEL_NPZ.exists():
+            raise RuntimeError(f'{MODEL_NPZ} not found; run tools/export_numpy_model.py first')
+        return NumpyLSTM.load(MODEL_NPZ)
+    if backend == 'tflite':
+        from src.tflite_model import TFLiteTextModel
+        if not MODEL_TFLITE.exists():
+            raise RuntimeError(f'{MODEL_TFLITE} not found; run tools/export_tflite.py first')
+        return TFLiteTextModel(MODEL_TFLITE)
+    raise ValueError(f'Unknown text model backend: {backend!r}')
 
 def get_vocab():
     """Return (word_to_index, max_len) using `reddy_tech.init()`.
@@ -113,3 +209,65 @@ def get_vocab():
     from src import reddy_tech
     _vocab = reddy_tech.init()
     return _vocab
+
+def model_fingerprint():
+    """Return a short hash of the weights and vocabulary files.
+
+    It tells whether the prebuilt artifact is stale; scores are keyed on
+    `inference_fingerprint()` instead. When only the prebuilt artifact is
+    deployed, the fingerprint recorded in it is used.
+    """
+    global _fingerprint
+    if _fingerprint is not None:
+        return _fingerprint
+    if not MODEL_WEIGHTS.exists():
+        metadata = read_artifact_metadata()
+        if metadata is not None:
+            _fingerprint = metadata['fingerprint']
+            return _fingerprint
+    _fingerprint = _hash_files(MODEL_WEIGHTS, VOCAB_FILE).hexdigest()[:16]
+    return _fingerprint
+
+def _hash_files(*paths):
+    h = hashlib.sha256()
+    for path in paths:
+        h.update(path.name.encode('utf-8') + b'\0')
+        if path.exists():
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    h.update(chunk)
+    return h
+
+def _artifact_path(backend):
+    """The file `load_inference_model(backend)` loads (or would load), or None."""
+    if backend == 'numpy':
+        return MODEL_NPZ
+    if backend == 'tflite':
+        return MODEL_TFLITE
+    if _model_path is not None:
+        return Path(_model_path)
+    try:
+        return _choose_load_strategy()[1]
+    except RuntimeError:
+        return None
+
+def inference_fingerprint(backend='keras', buckets=None):
+    """Return a short hash identifying the scores `load_inference_model(backend, buckets)` gives.
+
+    Unlike `model_fingerprint()` (weights and vocabulary only) it covers the
+    artifact the backend actually loads, the backend, whether that artifact
+    is quantized and the length buckets, since each of these shifts scores.
+    Cached and stored scores are keyed on this.
+    """
+    key = (backend, tuple(sorted(buckets or ())))
+    if key in _inference_fingerprints:
+        return _inference_fingerprints[key]
+    path = _artifact_path(backend)
+    quantized = False
+    if backend == 'tflite' and path.exists():
+        from src.tflite_model import is_quantized
+        quantized = is_quantized(path)
+    h = _hash_files(*[p for p in (path, VOCAB_FILE) if p is not None])
+    h.update(repr((backend, quantized, key[1])).encode('utf-8'))
+    _inference_fingerprints[key] = h.hexdigest()[:16]
+    return _inference_fingerprints[key]
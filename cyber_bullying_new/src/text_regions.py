@@ -0,0 +1,126 @@
+"""Resolution normalization and text-region cropping ahead of Tesseract.
+
+Phone photos and screenshots arrive at up to 4000px a side while their
+text is large, and memes are mostly picture. `prepare_for_ocr()` scales the
+grayscale image so its long side is within [min_side, max_side] and finds
+text-like regions with a morphological gradient (strong edges that close
+into solid horizontal blobs). Tesseract then sees either the rectangle
+spanning all regions ('crop') or only the regions stacked onto a blank
+canvas ('stack': fewer pixels, but reading order and context suffer).
+When the regions are missing or implausibly small, or would barely shrink
+the image, Tesseract gets the whole normalized image instead.
+"""
+import cv2
+import numpy as np
+
+# Regions are searched on a copy with this long side; boxes are mapped back
+DETECT_SIDE = 1000
+MODES = ('crop', 'stack')
+
+def normalize_resolution(gray, min_side=0, max_side=2000):
+    """Rescale so the long side lies within [min_side, max_side]."""
+    long_side = max(gray.shape[:2])
+    scale = 1.0
+    if max_side and long_side > max_side:
+        scale = max_side / long_side
+    elif min_side and long_side < min_side:
+        scale = min_side / long_side
+    if scale == 1.0:
+        return gray
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+    return cv2.resize(gray, None, fx=scale, fy=scale, interpolation=interpolation)
+
+def find_text_regions(gray, min_fill=0.45, margin=4):
+    """(x, y, w, h) boxes of probable text blocks in `gray`, top to bottom."""
+    height, width = gray.shape[:2]
+    scale = min(1.0, DETECT_SIDE / max(height, width))
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1 else gray
+    grad = cv2.morphologyEx(small, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3)))
+    _, edges = cv2.threshold(grad, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    # Join characters into words and lines
+    lines = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (9, 1)))
+    contours, _ = cv2.findContours(lines, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    mask = np.zeros_like(edges)
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if h < 6 or w < 6:
+            continue
+        # Lines of text close into solid, roughly rectangular blobs; so do
+        # whole columns of dense small print, which are kept too
+        if cv2.contourArea(contour) < min_fill * w * h:
+            continue
+        mask[y:y + h, x:x + w] = 255
+    # Merge neighbouring lines into blocks
+    blocks = cv2.dilate(mask, cv2.getStructuringElement(cv2.MORPH_RECT, (31, 15)))
+    contours, _ = cv2.findContours(blocks, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    boxes = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        x0 = max(0, int(x / scale) - margin)
+        y0 = max(0, int(y / scale) - margin)
+        x1 = min(width, int((x + w) / scale) + margin)
+        y1 = min(height, int((y + h) / scale) + margin)
+        boxes.append((x0, y0, x1 - x0, y1 - y0))
+    return sorted(boxes, key=lambda b: (b[1], b[0]))
+
+def stack_regions(gray, boxes, gap=16):
+    """Copy each box onto a white canvas, one below the other."""
+    width = max(w for _, _, w, _ in boxes) + 2 * gap
+    height = sum(h for _, _, _, h in boxes) + gap * (len(boxes) + 1)
+    canvas = np.full((height, width), 255, dtype=gray.dtype)
+    y = gap
+    for x0, y0, w, h in boxes:
+        canvas[y:y + h, gap:gap + w] = gray[y0:y0 + h, x0:x0 + w]
+        y += h + gap
+    return canvas
+
+def merge_boxes(boxes):
+    """Union of overlapping (x, y, w, h) boxes, top to bottom."""
+    merged = []
+    for box in sorted(boxes, key=lambda b: (b[1], b[0])):
+        x0, y0, w, h = box
+        x1, y1 = x0 + w, y0 + h
+        # Absorb every box this one touches; repeat, as the union may reach more
+        changed = True
+        while changed:
+            changed = False
+            for other in merged:
+                ox0, oy0, ow, oh = other
+                if ox0 <= x1 and x0 <= ox0 + ow and oy0 <= y1 and y0 <= oy0 + oh:
+                    merged.remove(other)
+                    x0, y0 = min(x0, ox0), min(y0, oy0)
+                    x1, y1 = max(x1, ox0 + ow), max(y1, oy0 + oh)
+                    changed = True
+                    break
+        merged.append((x0, y0, x1 - x0, y1 - y0))
+    return sorted(merged, key=lambda b: (b[1], b[0]))
+
+def prepare_for_ocr(gray, min_side=0, max_side=2000, mode='crop', min_coverage=0.1, max_keep=0.75, pad=16):
+    """Normalized image cut down to its text regions.
+
+    Boxes are padded by `pad` pixels above and below and twice that to the
+    sides (Tesseract misreads glyphs that touch the border, and the detector
+    often stops short of a line's ends), then merged where they overlap. The
+    whole normalized image is returned instead when no region is found, when
+    the regions cover less than `min_coverage` of it (the detector most
+    likely missed text rather than found all of it), or when the result
+    would keep more than `max_keep` of its pixels.
+    """
+    if mode not in MODES:
+        raise ValueError(f'Unknown text region mode {mode!r}; expected one of {MODES}')
+    gray = normalize_resolution(gray, min_side, max_side)
+    height, width = gray.shape[:2]
+    boxes = merge_boxes((max(0, x - 2 * pad), max(0, y - pad), min(width, x + w + 2 * pad) - max(0, x - 2 * pad),
+                         min(height, y + h + pad) - max(0, y - pad)) for x, y, w, h in find_text_regions(gray))
+    if sum(w * h for _, _, w, h in boxes) < min_coverage * width * height:
+        return gray
+    if mode == 'stack':
+        prepared = stack_regions(gray, boxes)
+    else:
+        x0 = min(x for x, _, _, _ in boxes)
+        y0 = min(y for _, y, _, _ in boxes)
+        x1 = max(x + w for x, _, w, _ in boxes)
+        y1 = max(y + h for _, y, _, h in boxes)
+        prepared = gray[y0:y1, x0:x1]
+    # Trimming a thin border saves little OCR time and risks clipping text
+    return gray if prepared.size > max_keep * gray.size else prepared
@@ -0,0 +1,75 @@
+"""TFLite export and serving for the LSTM text model.
+
+`export_tflite()` converts a loaded Keras model to a .tflite flatbuffer,
+optionally with dynamic-range int8 weight quantization. `TFLiteTextModel`
+serves the artifact through the same `predict(X)` contract as Keras.
+
+TFLite cannot resize the batch dimension of a converted LSTM, so the
+artifact is built for a fixed batch size and inputs are run in chunks of
+that size, zero-padding the last one.
+"""
+import numpy as np
+
+
+def _interpreter_class():
+    # Prefer the standalone runtimes so serving does not need all of TensorFlow
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        from tflite_runtime.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        import tensorflow as tf
+    except Exception as e:
+        raise RuntimeError('ai_edge_litert, tflite_runtime or TensorFlow is required to serve a .tflite model: ' + str(e))
+    return tf.lite.Interpreter
+
+def export_tflite(model, path, quantize=False, batch_size=1):
+    """Convert a Keras text model to `path`; returns the artifact size in bytes."""
+    import tensorflow as tf
+    max_len = int(model.inputs[0].shape[1])
+    inputs = tf.keras.Input(batch_shape=(batch_size, max_len), dtype='int32')
+    fixed = tf.keras.Model(inputs, model(inputs))
+    converter = tf.lite.TFLiteConverter.from_keras_model(fixed)
+    if quantize:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    flatbuffer = converter.convert()
+    with open(path, 'wb') as f:
+        f.write(flatbuffer)
+    return len(flatbuffer)
+
+def is_quantized(path):
+    """True if the artifact at `path` stores any weights as int8."""
+    interpreter = _interpreter_class()(model_path=str(path))
+    return any(d['dtype'] == np.int8 for d in interpreter.get_tensor_details())
+
+
+class TFLiteTextModel:
+    """Keras-style `predict(X)` over a .tflite artifact with a fixed batch size."""
+
+    def __init__(self, path):
+        self.interpreter = _interpreter_class()(model_path=str(path))
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self.batch_size, self.max_len = (int(d) for d in self._input['shape'])
+
+    def predict(self, X, verbose=0):
+        X = np.asarray(X, dtype=self._input['dtype'])
+        batch = np.zeros((self.batch_size, self.max_len), dtype=self._input['dtype'])
+        outputs = []
+        for start in range(0, len(X), self.batch_size):
+            chunk = X[start:start + self.batch_size]
+            batch[:len(chunk)] = chunk
+            batch[len(chunk):] = 0
+            self.interpreter.set_tensor(self._input['index'], batch)
+            self.interpreter.invoke()
+            outputs.append(self.interpreter.get_tensor(self._output['index'])[:len(chunk)])
+        if not outputs:
+            return np.zeros((0,) + tuple(self._output['shape'][1:]), dtype=np.float32)
+        return np.concatenate(outputs)
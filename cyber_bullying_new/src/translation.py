@@ -0,0 +1,165 @@
+"""Translation stage for posts: local language check, cache, timeout, circuit breaker.
+
+Posts that already look English (see `detect_language`) are never sent
+anywhere. Everything else is translated by a pluggable backend (any object
+with `translate(text, src, dest) -> str`) on a small thread pool, so a slow or
+unreachable endpoint costs at most `timeout` seconds per post. After
+`failure_threshold` consecutive failures the breaker opens and posts pass
+through untranslated for `cooldown` seconds.
+"""
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from src.caching import LRUCache
+
+
+class GoogleTransBackend:
+    """googletrans client, imported and created on first use."""
+
+    def __init__(self):
+        self._translator = None
+
+    def translate(self, text, src, dest):
+        if self._translator is None:
+            from googletrans import Translator
+            self._translator = Translator()
+        return self._translator.translate(text, src=src, dest=dest).text
+
+
+class IdentityBackend:
+    """Local stand-in that returns the text unchanged (tests, offline use)."""
+
+    def translate(self, text, src, dest):
+        return text
+
+
+BACKENDS = {
+    'googletrans': GoogleTransBackend,
+    'identity': IdentityBackend,
+}
+
+ROMANIZED_RULES = ('skip', 'translate')
+
+@lru_cache(maxsize=1)
+def english_stopwords():
+    """NLTK's English stopword list, or an empty set if the corpus is missing."""
+    try:
+        from nltk.corpus import stopwords
+        return frozenset(stopwords.words('english'))
+    except LookupError:
+        print('NLTK stopwords not found; English posts will not be recognized locally')
+        return frozenset()
+
+def langdetect_english(text, min_probability):
+    """True/False if langdetect is installed and sure either way, else None."""
+    try:
+        from langdetect import DetectorFactory, detect_langs
+        from langdetect.lang_detect_exception import LangDetectException
+    except ImportError:
+        return None
+    DetectorFactory.seed = 0
+    try:
+        best = detect_langs(text)[0]
+    except LangDetectException:
+        return None
+    if best.prob < min_probability:
+        return None
+    return best.lang == 'en'
+
+def detect_language(text, romanized='skip', min_stopword_ratio=0.25, min_probability=0.9):
+    """Cheap local guess at the language of `text`: 'en' or 'auto' (let the backend detect).
+
+    A post is English when at least `min_stopword_ratio` of its words (and
+    two or more) are English stopwords, or when langdetect (if installed) says so with
+    `min_probability`. Any other post written only in ASCII letters, such as
+    romanized Hindi, follows the `romanized` rule: 'skip' treats it as 'en'
+    and keeps it as written, 'translate' sends it to the backend. Everything
+    else is 'auto'.
+    """
+    if romanized not in ROMANIZED_RULES:
+        raise ValueError(f'romanized must be one of {ROMANIZED_RULES}, not {romanized!r}')
+    letters = [c for c in text if c.isalpha()]
+    if not letters:
+        return 'en'
+    words = re.findall(r"[a-z']+", text.lower())
+    stopwords = english_stopwords()
+    hits = sum(word in stopwords for word in words)
+    # One shared word ('so', 'a') is not enough to call a short post English
+    if hits >= 2 and hits / len(words) >= min_stopword_ratio:
+        return 'en'
+    if langdetect_english(text, min_probability):
+        return 'en'
+    if romanized == 'skip' and all(c.isascii() for c in letters):
+        return 'en'
+    return 'auto'
+
+
+class TranslationStage:
+    def __init__(self, backend, cache_size=1000, timeout=2.0, failure_threshold=3, cooldown=60.0, workers=2,
+                 romanized='skip'):
+        self.backend = backend
+        self.romanized = romanized
+        self.cache = LRUCache(cache_size)
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='translate')
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._open_until = 0.0
+        self.counts = {'skipped': 0, 'cached': 0, 'translated': 0, 'failed': 0, 'short_circuited': 0}
+
+    def translate(self, text, dest='en'):
+        """Return `text` translated to `dest`, or unchanged if that is not possible."""
+        src = detect_language(text, self.romanized)
+        if src == dest:
+            self._count('skipped')
+            return text
+        key = (dest, text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._count('cached')
+            return cached
+        if self.circuit_open():
+            self._count('short_circuited')
+            return text
+        future = self._executor.submit(self.backend.translate, text, src, dest)
+        try:
+            result = future.result(timeout=self.timeout)
+        except Exception as e:
+            future.cancel()
+            print('Translation error:', repr(e))
+            self._record(success=False)
+            return text
+        self._record(success=True)
+        self.cache.put(key, result)
+        return result
+
+    def circuit_open(self):
+        return time.monotonic() < self._open_until
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counts)
+        stats['circuit_open'] = self.circuit_open()
+        stats['consecutive_failures'] = self._failures
+        return stats
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def _record(self, success):
+        with self._lock:
+            if success:
+                self.counts['translated'] += 1
+                self._failures = 0
+                return
+            self.counts['failed'] += 1
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._open_until = time.monotonic() + self.cooldown
+                self._failures = 0
@@ -0,0 +1,118 @@
+"""Benchmark retrain.py's training loop on text vs memory-mapped bottlenecks.
+
+Run from project root:
+    python tools/bench_bottlenecks.py [--images 2000] [--size 2048] [--batch-size 100] [--steps 200]
+
+A synthetic bottleneck cache (two labels, --images per label, --size floats
+per image) is written the old way, one text file per image, and converted
+with retrain.convert_text_bottlenecks(). The script then times --steps
+training batches (train_batch_size images each, sampled as
+get_random_cached_bottlenecks() samples them) two ways:
+- the original loop: read and parse one text file per image;
+- get_random_cached_bottlenecks(): one gather from the memory-mapped store.
+Each is reported alone and with a training step (add_final_training_ops)
+run on the batch, as steps/sec.
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+import retrain
+from retrain import tf
+
+ARCHITECTURE = 'inception_v3'
+
+def make_cache(bottleneck_dir, images, size):
+    """Text bottleneck files for two labels; returns their image_lists."""
+    rng = np.random.default_rng(0)
+    image_lists = {}
+    for label in ('fake', 'original'):
+        names = [f'{label}_{i}.jpg' for i in range(images)]
+        image_lists[label] = {'dir': label, 'training': names, 'testing': [], 'validation': []}
+        (Path(bottleneck_dir) / label).mkdir()
+        for name in names:
+            values = rng.random(size, dtype=np.float32)
+            path = Path(bottleneck_dir) / label / f'{name}_{ARCHITECTURE}.txt'
+            path.write_text(','.join(str(x) for x in values))
+    return image_lists
+
+def text_batch(image_lists, how_many, bottleneck_dir):
+    """The original get_random_cached_bottlenecks(): parse one file per image."""
+    class_count = len(image_lists.keys())
+    bottlenecks = []
+    ground_truths = []
+    for _ in range(how_many):
+        label_index = random.randrange(class_count)
+        label_name = list(image_lists.keys())[label_index]
+        image_index = random.randrange(retrain.MAX_NUM_IMAGES_PER_CLASS + 1)
+        path = retrain.get_bottleneck_path(image_lists, label_name, image_index, bottleneck_dir,
+                                           'training', ARCHITECTURE)
+        with open(path) as f:
+            bottlenecks.append([float(x) for x in f.read().split(',')])
+        ground_truth = np.zeros(class_count, dtype=np.float32)
+        ground_truth[label_index] = 1.0
+        ground_truths.append(ground_truth)
+    return bottlenecks, ground_truths
+
+def store_batch(image_lists, how_many, bottleneck_dir):
+    bottlenecks, ground_truths, _ = retrain.get_random_cached_bottlenecks(
+        None, image_lists, how_many, 'training', bottleneck_dir, '', None, None, None, None, ARCHITECTURE)
+    return bottlenecks, ground_truths
+
+def run(get_batch, steps, train=None):
+    start = time.perf_counter()
+    for _ in range(steps):
+        bottlenecks, ground_truths = get_batch()
+        if train:
+            train(bottlenecks, ground_truths)
+    return steps / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--images', type=int, default=2000, help='cached images per label')
+    parser.add_argument('--size', type=int, default=2048, help='bottleneck values per image')
+    parser.add_argument('--batch-size', type=int, default=100, help='images per training step')
+    parser.add_argument('--steps', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as bottleneck_dir:
+        start = time.perf_counter()
+        image_lists = make_cache(bottleneck_dir, args.images, args.size)
+        print(f'wrote {2 * args.images} text bottlenecks in {time.perf_counter() - start:.1f}s')
+        start = time.perf_counter()
+        # The store would otherwise expect inception_v3's 2048 values per row
+        retrain.bottleneck_stores[(bottleneck_dir, ARCHITECTURE)] = retrain.BottleneckStore(
+            bottleneck_dir, ARCHITECTURE, args.size)
+        retrain.convert_text_bottlenecks(bottleneck_dir, ARCHITECTURE)
+        print(f'converted to {ARCHITECTURE} store in {time.perf_counter() - start:.1f}s')
+
+        retrain.FLAGS = argparse.Namespace(learning_rate=0.01)
+        with tf.Graph().as_default():
+            bottleneck_tensor = tf.placeholder(tf.float32, [None, args.size])
+            train_step, _, bottleneck_input, ground_truth_input, _ = retrain.add_final_training_ops(
+                len(image_lists), 'final_result', bottleneck_tensor, args.size)
+            with tf.Session() as sess:
+                sess.run(tf.global_variables_initializer())
+
+                def train(bottlenecks, ground_truths):
+                    sess.run(train_step, {bottleneck_input: bottlenecks, ground_truth_input: ground_truths})
+
+                paths = {'text files': lambda: text_batch(image_lists, args.batch_size, bottleneck_dir),
+                         'memmap store': lambda: store_batch(image_lists, args.batch_size, bottleneck_dir)}
+                print(f'\n{args.steps} steps of {args.batch_size} images, {args.size} values each')
+                print(f'{"cache":<16}{"batches/s":>12}{"train steps/s":>16}')
+                for name, get_batch in paths.items():
+                    run(get_batch, 3, train)
+                    print(f'{name:<16}{run(get_batch, args.steps):>12.1f}'
+                          f'{run(get_batch, args.steps, train):>16.1f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Compare and time the clean_text pipelines on our own posts.
+
+Run from project root:
+    python tools/bench_clean_text.py [--repeat N]
+
+Posts come from every user table in src/main.db plus exported_posts.csv.
+The script reports any post where the regex tokenizer disagrees with
+word_tokenize, then times the original uncached pipeline against
+clean_texts() with the nltk and regex tokenizers.
+"""
+import argparse
+import csv
+import sys
+import time
+from pathlib import Path
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+from cs50 import SQL
+from src import reddy_tech
+
+def load_posts():
+    db = SQL(f"sqlite:///{root / 'src' / 'main.db'}")
+    posts = []
+    for u in db.execute('SELECT DISTINCT username FROM users'):
+        try:
+            posts.extend(p['text'] for p in db.execute('SELECT text FROM :tablename', tablename=u['username']))
+        except Exception:
+            continue
+    with open(root / 'exported_posts.csv', newline='', encoding='utf-8') as f:
+        posts.extend(row['text'] for row in csv.DictReader(f))
+    return posts
+
+def legacy_clean_text(review):
+    words = reddy_tech.word_tokenize(review)
+    output_words = []
+    for word in words:
+        word_lower = word.lower()
+        if word_lower not in reddy_tech.stop_words:
+            output_words.append(reddy_tech.lemmatizer.lemmatize(word_lower))
+    return " ".join(output_words)
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=20, help='passes over the corpus per timing')
+    args = parser.parse_args()
+
+    posts = load_posts()
+    print(f'{len(posts)} posts ({len(set(posts))} distinct)\n')
+
+    mismatches = 0
+    for post in sorted(set(posts)):
+        expected = reddy_tech.word_tokenize(post)
+        got = reddy_tech.regex_tokenize(post)
+        if expected != got:
+            mismatches += 1
+            print(f'token mismatch for {post[:60]!r}:\n  nltk  {expected}\n  regex {got}')
+    print(f'regex tokenizer mismatches: {mismatches}\n')
+
+    legacy_time, legacy = timed(lambda: [legacy_clean_text(p) for p in posts], args.repeat)
+    nltk_time, cleaned = timed(lambda: reddy_tech.clean_texts(posts, tokenizer='nltk'), args.repeat)
+    regex_time, regex_cleaned = timed(lambda: reddy_tech.clean_texts(posts, tokenizer='regex'), args.repeat)
+    assert legacy == cleaned, 'clean_texts output differs from the original pipeline'
+
+    per_post = 1e6 / (len(posts) * args.repeat)
+    print(f'{"pipeline":<24} {"us/post":>10} {"speedup":>8}')
+    print(f'{"original clean_text":<24} {legacy_time * per_post:>10.1f} {1:>7.1f}x')
+    print(f'{"clean_texts (nltk)":<24} {nltk_time * per_post:>10.1f} {legacy_time / nltk_time:>7.1f}x')
+    print(f'{"clean_texts (regex)":<24} {regex_time * per_post:>10.1f} {legacy_time / regex_time:>7.1f}x')
+    print(f'\nregex output differs from nltk output on {sum(a != b for a, b in zip(cleaned, regex_cleaned))} posts')
+    print('lemma cache:', reddy_tech._clean_word.cache_info())
+
+if __name__ == '__main__':
+    main()
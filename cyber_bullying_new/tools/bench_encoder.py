@@ -0,0 +1,71 @@
+"""Benchmark reddy_tech.encode_sentences against the original per-word loop.
+
+Run from project root:
+    python tools/bench_encoder.py
+
+Sentences are the cleaned posts in exported_posts.csv, repeated to reach each
+batch size. The vocabulary comes from src/word_to_index.pkl when present,
+otherwise it is built from the same posts.
+"""
+import csv
+import pickle
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+from src import reddy_tech
+
+SIZES = (1, 64, 4096)
+MAX_LEN = 30
+
+def legacy_sentences_to_indices(X, word_to_index, max_len):
+    m = len(X)
+    X_indices = np.zeros((m, max_len))
+    for i in range(m):
+        sentence_words = [w.lower() for w in X[i].split()]
+        j = 0
+        for word in sentence_words:
+            if word in word_to_index:
+                X_indices[i, j] = word_to_index[word]
+            j += 1
+    return X_indices
+
+def load_corpus():
+    with open(root / 'exported_posts.csv', newline='', encoding='utf-8') as f:
+        cleaned = [row['cleaned'] for row in csv.DictReader(f)]
+    # The legacy loop raises IndexError on anything longer than max_len
+    return [s for s in cleaned if s and len(s.split()) <= MAX_LEN]
+
+def load_vocab(corpus):
+    path = root / 'src' / 'word_to_index.pkl'
+    if path.exists():
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    words = sorted({w.lower() for s in corpus for w in s.split()})
+    return {w: i + 1 for i, w in enumerate(words)}
+
+def main():
+    corpus = load_corpus()
+    word_to_index = load_vocab(corpus)
+    print(f'{len(corpus)} distinct posts, vocab size {len(word_to_index)}, max_len {MAX_LEN}\n')
+    print(f'{"sentences":>10} {"legacy ms":>12} {"encode ms":>12} {"encode+out ms":>14} {"speedup":>8}')
+    for n in SIZES:
+        X = [corpus[i % len(corpus)] for i in range(n)]
+        expected = legacy_sentences_to_indices(X, word_to_index, MAX_LEN)
+        buf = np.zeros((n, MAX_LEN), dtype=np.int32)
+        got = reddy_tech.encode_sentences(X, word_to_index, MAX_LEN, out=buf)
+        assert np.array_equal(expected, got), 'encode_sentences disagrees with the legacy encoder'
+
+        number = max(1, 20000 // n)
+        legacy = min(timeit.repeat(lambda: legacy_sentences_to_indices(X, word_to_index, MAX_LEN), number=number, repeat=5)) / number
+        fresh = min(timeit.repeat(lambda: reddy_tech.encode_sentences(X, word_to_index, MAX_LEN), number=number, repeat=5)) / number
+        reuse = min(timeit.repeat(lambda: reddy_tech.encode_sentences(X, word_to_index, MAX_LEN, out=buf), number=number, repeat=5)) / number
+        print(f'{n:>10} {legacy * 1e3:>12.4f} {fresh * 1e3:>12.4f} {reuse * 1e3:>14.4f} {legacy / reuse:>7.1f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Compare exported_posts as CSV, Parquet and Arrow IPC: file size and read time.
+
+Run from project root (needs pyarrow):
+    python tools/bench_export_formats.py [--runs 5]
+
+Exports all posts once per format into a temporary directory (scores come
+from the score cache after the first run), then times reading each file
+back into typed columns: CSV through csv.DictReader with float/datetime
+conversion, Parquet through pyarrow.parquet and Arrow through a
+memory-mapped IPC reader. The int32 index matrix is timed as a memory-mapped
+.npy load against re-cleaning and re-encoding the text.
+"""
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import export_posts
+from export_posts import TIMESTAMP_FORMAT
+from src import reddy_tech
+from src.text_classifier import get_vocab
+
+def read_csv(path):
+    columns = {name: [] for name in export_posts.FIELDS}
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            columns['username'].append(row['username'])
+            columns['text'].append(row['text'])
+            columns['cleaned'].append(row['cleaned'])
+            columns['score'].append(float(row['score']) if row['score'] else np.nan)
+            columns['timestamp'].append(datetime.strptime(row['timestamp'], TIMESTAMP_FORMAT) if row['timestamp'] else None)
+    columns['score'] = np.array(columns['score'], dtype=np.float32)
+    return columns
+
+def read_parquet(path):
+    import pyarrow.parquet as pq
+    return pq.read_table(path)
+
+def read_arrow(path):
+    import pyarrow as pa
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).read_all()
+
+READERS = {'csv': read_csv, 'parquet': read_parquet, 'arrow': read_arrow}
+
+def best_time(fn, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--batch-size', type=int, default=256)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {fmt: os.path.join(tmp, f'posts.{fmt}') for fmt in READERS}
+        matrix_path = os.path.join(tmp, 'posts_X.npy')
+        for fmt, path in paths.items():
+            export_posts.export_all(path, args.batch_size, fmt=fmt, index_path=matrix_path if fmt == 'csv' else None)
+
+        print(f'\n{"format":<10}{"size":>12}{"read (ms)":>12}')
+        for fmt, path in paths.items():
+            elapsed = best_time(lambda: READERS[fmt](path), args.runs)
+            print(f'{fmt:<10}{os.path.getsize(path):>12,}{elapsed * 1e3:>12.2f}')
+
+        word_to_index, max_len = get_vocab()
+        texts = read_csv(paths['csv'])['text']
+        mapped = best_time(lambda: np.asarray(np.load(matrix_path, mmap_mode='r')).sum(), args.runs)
+        encoded = best_time(lambda: reddy_tech.encode_sentences(reddy_tech.clean_texts(texts), word_to_index, max_len), args.runs)
+        print(f'\nindex matrix {np.load(matrix_path, mmap_mode="r").shape}, {os.path.getsize(matrix_path):,} bytes')
+        print(f'mmap .npy load: {mapped * 1e3:.2f} ms vs re-clean + encode: {encoded * 1e3:.2f} ms')
+
+if __name__ == '__main__':
+    main()
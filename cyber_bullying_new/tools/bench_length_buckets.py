@@ -0,0 +1,80 @@
+"""Benchmark length-bucketed inference on the real post length distribution.
+
+Run from project root:
+    python tools/bench_length_buckets.py [--backend numpy] [--buckets 8,16] [--batch-size 32]
+
+Every post in src/main.db is cleaned and encoded, the distribution of real
+lengths is printed, and the posts are scored in batches both at the full
+max_len and through BucketedModel. Reported: LSTM timesteps actually run,
+wall time, and how far bucketed scores drift from the full-length ones
+(max/mean absolute difference and flips across the 0.4 threshold).
+"""
+import argparse
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+from cs50 import SQL
+from src import reddy_tech
+from src.batcher import BucketedModel
+from src.text_classifier import load_inference_model, get_vocab, variable_length_model
+
+THRESHOLD = 0.4
+
+def load_posts():
+    db = SQL(f"sqlite:///{root / 'src' / 'main.db'}")
+    posts = []
+    for u in db.execute('SELECT DISTINCT username FROM users'):
+        try:
+            posts.extend(p['text'] for p in db.execute('SELECT text FROM :tablename', tablename=u['username']))
+        except Exception:
+            continue
+    return posts
+
+def score(model, X, batch_size, runs):
+    model.predict(X[:batch_size], verbose=0)
+    start = time.perf_counter()
+    for _ in range(runs):
+        out = np.concatenate([model.predict(X[i:i + batch_size], verbose=0) for i in range(0, len(X), batch_size)])
+    return out, (time.perf_counter() - start) / runs
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--backend', default='numpy', choices=['numpy', 'keras'])
+    parser.add_argument('--buckets', default='8,16', help='comma-separated bucket lengths')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+    buckets = [int(b) for b in args.buckets.split(',')]
+
+    word_to_index, max_len = get_vocab()
+    cleaned = reddy_tech.clean_texts(load_posts())
+    X = reddy_tech.encode_sentences(cleaned, word_to_index, max_len)
+    lengths = [min(len(c.split()), max_len) for c in cleaned]
+    print(f'{len(X)} posts; cleaned length distribution:')
+    for length, count in sorted(Counter(lengths).items()):
+        print(f'  {length:>3} tokens: {count}')
+
+    model = load_inference_model(args.backend)
+    bucketed = BucketedModel(variable_length_model(model) if args.backend == 'keras' else model, buckets)
+    bounds = sorted(buckets) + [max_len]
+    steps = sum(next(b for b in bounds if l <= b) for l in lengths)
+
+    full_scores, full_time = score(model, X, args.batch_size, args.runs)
+    bucket_scores, bucket_time = score(bucketed, X, args.batch_size, args.runs)
+    diff = np.abs(full_scores - bucket_scores)
+    flips = int(((full_scores[:, 0] < THRESHOLD) != (bucket_scores[:, 0] < THRESHOLD)).sum())
+
+    print(f'\nbackend {args.backend}, buckets {bounds}, batch size {args.batch_size}')
+    print(f'LSTM timesteps: {len(X) * max_len} full vs {steps} bucketed ({len(X) * max_len / steps:.1f}x fewer)')
+    print(f'wall time: {full_time * 1e3:.1f} ms full vs {bucket_time * 1e3:.1f} ms bucketed ({full_time / bucket_time:.1f}x)')
+    print(f'score drift: max {diff.max():.4f}, mean {diff.mean():.4f}, {flips} decisions flipped at {THRESHOLD}')
+
+if __name__ == '__main__':
+    main()
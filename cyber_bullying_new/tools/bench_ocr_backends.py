@@ -0,0 +1,76 @@
+"""Compare OCR backend throughput on the images in static/test.
+
+Run from project root:
+    python tools/bench_ocr_backends.py [--backends subprocess,tesserocr] [--limit 100] [--regions crop]
+
+Images are decoded and preprocessed once up front (as /detect does, see
+OCR_TEXT_REGIONS), so only OCR itself is timed. For each backend the
+reported figures are its setup time, images per second, mean and p95
+latency, and how closely its text matches the first backend's (difflib
+ratio on whitespace-collapsed text).
+"""
+import argparse
+import difflib
+import sys
+import time
+from pathlib import Path
+
+import cv2
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+import config as app_config
+from src.ocr_backends import create_backend
+from src.text_regions import prepare_for_ocr
+
+def load_images(directory, limit, regions):
+    images = []
+    for path in sorted(Path(directory).iterdir()):
+        image = cv2.imread(str(path))
+        if image is None:
+            continue
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if regions != 'off':
+            gray = prepare_for_ocr(gray, app_config.OCR_MIN_SIDE, app_config.OCR_MAX_SIDE, regions)
+        if gray is not None:
+            images.append(gray)
+        if limit and len(images) == limit:
+            break
+    return images
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dir', default=str(root / 'static' / 'test'))
+    parser.add_argument('--backends', default='subprocess,tesserocr')
+    parser.add_argument('--limit', type=int, default=100)
+    parser.add_argument('--regions', default=app_config.OCR_TEXT_REGIONS, choices=['crop', 'stack', 'off'])
+    args = parser.parse_args()
+
+    images = load_images(args.dir, args.limit, args.regions)
+    print(f'{len(images)} images, text regions: {args.regions}\n')
+    print(f'{"backend":<12}{"setup (s)":>10}{"img/s":>10}{"mean (ms)":>11}{"p95 (ms)":>10}{"similarity":>12}')
+    reference = None
+    for name in args.backends.split(','):
+        start = time.perf_counter()
+        try:
+            backend = create_backend(name)
+        except Exception as e:
+            print(f'{name:<12}unavailable: {e}')
+            continue
+        setup = time.perf_counter() - start
+        texts, latencies = [], []
+        for gray in images:
+            t0 = time.perf_counter()
+            texts.append(' '.join(backend.image_to_string(gray).split()))
+            latencies.append(time.perf_counter() - t0)
+        if reference is None:
+            reference = texts
+        similarity = sum(difflib.SequenceMatcher(None, a, b).ratio() for a, b in zip(reference, texts)) / len(texts)
+        latencies.sort()
+        total = sum(latencies)
+        print(f'{name:<12}{setup:>10.2f}{len(images) / total:>10.1f}{total / len(images) * 1e3:>11.1f}'
+              f'{latencies[int(0.95 * (len(latencies) - 1))] * 1e3:>10.1f}{similarity:>12.2f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark OCR with and without text-region preprocessing over static/test.
+
+Run from project root (needs tesseract):
+    python tools/bench_ocr_preprocess.py [--dir static/test] [--limit 50] [--mode crop|stack]
+                                         [--max-side 2000] [--min-side 0]
+
+Every image is OCR'd three times: the full-resolution grayscale image as
+/detect used to do, the output of text_regions.prepare_for_ocr(), and the
+full image less a 1-pixel border. Reported:
+- total OCR time for each path, preprocessing included;
+- images given to Tesseract whole (no usable regions, or not worth cutting);
+- text similarity (difflib ratio on lowercased, whitespace-collapsed text);
+- the share of full-image words (3+ letters) still recognized.
+The full-image text is the reference here, not a ground truth: Tesseract
+output shifts with any change to the pixels, and the 1-pixel-border run
+shows how far. Preprocessing loses no text when its recall is at least that
+baseline's.
+"""
+import argparse
+import difflib
+import re
+import sys
+import time
+from pathlib import Path
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+from src.ocr import get_ocr_modules
+from src.text_regions import normalize_resolution, prepare_for_ocr, MODES
+
+def normalize(text):
+    return ' '.join(text.lower().split())
+
+def words(text):
+    return set(re.findall(r'[a-z]{3,}', text))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dir', default=str(root / 'static' / 'test'))
+    parser.add_argument('--limit', type=int, default=0, help='only the first N images (0 = all)')
+    parser.add_argument('--mode', default='crop', choices=MODES)
+    parser.add_argument('--min-side', type=int, default=0)
+    parser.add_argument('--max-side', type=int, default=2000)
+    args = parser.parse_args()
+    cv2, pytesseract = get_ocr_modules()
+
+    paths = sorted(p for p in Path(args.dir).iterdir() if p.suffix.lower() in ('.jpg', '.jpeg', '.png', '.bmp', '.tiff'))
+    if args.limit:
+        paths = paths[:args.limit]
+    full_time = prep_time = 0.0
+    full_pixels = prep_pixels = 0
+    similarities = []
+    recalls = []
+    baseline_recalls = []
+    whole = 0
+    for path in paths:
+        image = cv2.imread(str(path))
+        if image is None:
+            continue
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+        t0 = time.perf_counter()
+        full_text = normalize(pytesseract.image_to_string(gray))
+        t1 = time.perf_counter()
+        prepared = prepare_for_ocr(gray, args.min_side, args.max_side, args.mode)
+        prep_text = normalize(pytesseract.image_to_string(prepared))
+        t2 = time.perf_counter()
+        baseline_text = normalize(pytesseract.image_to_string(gray[1:-1, 1:-1]))
+
+        full_time += t1 - t0
+        prep_time += t2 - t1
+        full_pixels += gray.size
+        prep_pixels += prepared.size
+        is_whole = prepared.shape == normalize_resolution(gray, args.min_side, args.max_side).shape
+        whole += is_whole
+        if full_text or prep_text:
+            similarities.append(difflib.SequenceMatcher(None, full_text, prep_text).ratio())
+        if words(full_text):
+            recalls.append(len(words(full_text) & words(prep_text)) / len(words(full_text)))
+            baseline_recalls.append(len(words(full_text) & words(baseline_text)) / len(words(full_text)))
+        print(f'{path.name[:40]:<40} {t1 - t0:6.2f}s -> {t2 - t1:6.2f}s  '
+              f'{"whole" if is_whole else f"{prepared.size / gray.size:5.0%} px"}  '
+              f'{similarities[-1] if full_text or prep_text else 1.0:.2f}')
+
+    print(f'\n{len(paths)} images, {whole} OCR\'d whole (no usable regions, or not worth cutting)')
+    print(f'pixels sent to OCR: {full_pixels:,} full vs {prep_pixels:,} preprocessed ({prep_pixels / full_pixels:.0%})')
+    print(f'OCR time: {full_time:.1f}s full vs {prep_time:.1f}s preprocessed ({full_time / prep_time:.2f}x)')
+    if similarities:
+        print(f'text similarity to full-image OCR: mean {sum(similarities) / len(similarities):.2f} over {len(similarities)} images with text')
+    if recalls:
+        print(f'full-image words still recognized: mean {sum(recalls) / len(recalls):.0%} '
+              f'(full image less a 1px border: {sum(baseline_recalls) / len(baseline_recalls):.0%})')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""Add the images in existing folders to the near-duplicate index.
+
+Run from project root:
+    python tools/build_image_index.py [static/images static/test ...] [--no-ocr] [--no-classify]
+                                      [--batch-size 32]
+
+Every image is hashed (src/image_hash.py) and its OCR text and fake/original
+result are computed the way /detect and /image compute them, then stored in
+IMAGE_HASH_DB under the same namespaces. Later uploads of these images, or
+re-encoded and resized reposts of them, are then answered from the index.
+Images already in the index (same hash and shape) are skipped, so a rerun
+only adds new files. Results of a kind whose distance (OCR_HASH_DISTANCE,
+IMAGE_HASH_DISTANCE) is negative are not reused by the app, so they are
+not indexed either.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+import config as app_config
+from src.image_hash import get_hash_index, image_key, namespace
+
+EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp')
+
+def find_images(directories):
+    paths = []
+    for directory in directories:
+        paths.extend(p for p in sorted(Path(directory).rglob('*')) if p.is_file() and p.suffix.lower() in EXTENSIONS)
+    return paths
+
+def index_ocr(index, paths):
+    """OCR each new image as run_ocr() does and store its text."""
+    import cv2
+    from src.ocr import decode_image, get_ocr_cache, ocr_settings, preprocess
+    from src.ocr_backends import get_ocr_backend
+    backend = get_ocr_backend()
+    cache = get_ocr_cache()
+    settings = ocr_settings()
+    ns = namespace('ocr', settings)
+    added = 0
+    for path in paths:
+        image = decode_image(cv2, path)
+        if image is None:
+            print(f'skipping {path}: could not decode')
+            continue
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        key = image_key(gray)
+        if index.find(ns, key, 0) is not None:
+            continue
+        cache_key = cache.key(gray, settings)
+        text = cache.get(cache_key)
+        if text is None:
+            prepared = preprocess(gray)
+            text = backend.image_to_string(prepared) if prepared is not None else ''
+            cache.put(cache_key, text)
+        index.add(ns, key, text)
+        added += 1
+    return added
+
+def index_classifications(index, paths, batch_size):
+    """Classify each new image as /image does and store its probabilities."""
+    import cv2
+    import label_image
+    classifier = label_image.ImageClassifier(str(root / label_image.MODEL_FILE), str(root / label_image.LABEL_FILE))
+    ns = namespace('image', classifier.fingerprint)
+    pending = []
+    added = 0
+
+    def flush():
+        results = classifier.classify_batch([image for _, image in pending])
+        for (key, _), probabilities in zip(pending, results):
+            index.add(ns, key, json.dumps(probabilities))
+        del pending[:]
+        return len(results)
+
+    for path in paths:
+        try:
+            image = label_image.decode_bgr(path.read_bytes())
+        except ValueError as e:
+            print(f'skipping {path}: {e}')
+            continue
+        key = image_key(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY))
+        if index.find(ns, key, 0) is None:
+            pending.append((key, classifier.preprocess(image)))
+        if len(pending) == batch_size:
+            added += flush()
+    if pending:
+        added += flush()
+    classifier.close()
+    return added
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('dirs', nargs='*', default=[str(root / 'static' / 'images'), str(root / 'static' / 'test')])
+    parser.add_argument('--no-ocr', action='store_true', help='do not OCR the images')
+    parser.add_argument('--no-classify', action='store_true', help='do not run the fake/original classifier')
+    parser.add_argument('--batch-size', type=int, default=32, help='images per classifier run')
+    args = parser.parse_args()
+
+    index = get_hash_index()
+    if index is None:
+        parser.error('IMAGE_HASH_DB is not set')
+    paths = find_images(args.dirs)
+    print(f'{len(paths)} images in {", ".join(args.dirs)} -> {app_config.IMAGE_HASH_DB}')
+    if args.no_ocr:
+        pass
+    elif app_config.OCR_HASH_DISTANCE < 0:
+        print('OCR: skipped, OCR_HASH_DISTANCE is negative')
+    else:
+        start = time.perf_counter()
+        added = index_ocr(index, paths)
+        print(f'OCR: {added} images added in {time.perf_counter() - start:.1f}s')
+    if args.no_classify:
+        pass
+    elif app_config.IMAGE_HASH_DISTANCE < 0:
+        print('classifier: skipped, IMAGE_HASH_DISTANCE is negative')
+    else:
+        start = time.perf_counter()
+        added = index_classifications(index, paths, max(1, args.batch_size))
+        print(f'classifier: {added} images added in {time.perf_counter() - start:.1f}s')
+    print(f'index entries: {index.stats()["entries"]}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+"""Build the prebuilt serving artifact src/LSTM_full.h5 once.
+
+Run from project root (needs TensorFlow):
+    python tools/build_model_artifact.py [--out src/LSTM_full.h5]
+
+Workers then load the full model in one step instead of inspecting and
+reconstructing src/LSTM.h5 on every cold start. Rebuild whenever
+src/LSTM.h5 or src/word_to_index.pkl change; load_text_model() warns and
+falls back to reconstructing when the recorded fingerprint is stale.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+from src.text_classifier import build_serving_artifact, MODEL_FULL
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--out', default=str(MODEL_FULL), help='artifact path')
+    args = parser.parse_args()
+    metadata = build_serving_artifact(Path(args.out))
+    print('Wrote', args.out, metadata)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Check the NumPy backend against the Keras model and compare their cost.
+
+Run from project root after tools/export_numpy_model.py:
+    python tools/check_numpy_model.py [--atol 1e-4]
+or, without the trained weights (e.g. in CI):
+    python tools/check_numpy_model.py --synthetic [--atol 1e-4]
+
+Parity is checked on the cleaned posts in exported_posts.csv plus random
+index rows. Startup time, per-batch latency and peak RSS are measured for
+each backend in a fresh subprocess so one does not inflate the other.
+
+--synthetic instead builds small randomly initialized models with
+build_text_model() (sigmoid and softmax heads), exports them with
+export_npz() and asserts that NumPy and Keras agree within --atol on
+random, partly zero-padded rows. Exits with status 1 on any mismatch.
+"""
+import argparse
+import csv
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+BATCH_SIZES = (1, 64)
+
+def sample_inputs(word_to_index, max_len, n_random=256):
+    from src import reddy_tech
+    with open(root / 'exported_posts.csv', newline='', encoding='utf-8') as f:
+        cleaned = [row['cleaned'] for row in csv.DictReader(f)]
+    X = reddy_tech.encode_sentences(cleaned, word_to_index, max_len)
+    rng = np.random.default_rng(0)
+    random_rows = rng.integers(0, len(word_to_index) + 1, size=(n_random, max_len), dtype=np.int32)
+    return np.concatenate([X, random_rows])
+
+def measure(backend):
+    """Runs in a child process: load one backend, time it, report peak RSS."""
+    start = time.perf_counter()
+    from src.text_classifier import load_inference_model, get_vocab
+    model = load_inference_model(backend)
+    word_to_index, max_len = get_vocab()
+    load_time = time.perf_counter() - start
+    X = sample_inputs(word_to_index, max_len)
+    latency = {}
+    for n in BATCH_SIZES:
+        batch = X[:n]
+        model.predict(batch, verbose=0)
+        runs = 20
+        t0 = time.perf_counter()
+        for _ in range(runs):
+            model.predict(batch, verbose=0)
+        latency[n] = (time.perf_counter() - t0) / runs * 1e3
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({'load_s': load_time, 'latency_ms': latency, 'rss_mb': rss_mb}))
+
+def synthetic_parity(atol, vocab_len=500, max_len=20, emb_dim=16, rows=64):
+    """Assert NumPy/Keras parity on random models; returns the largest difference."""
+    from src.numpy_lstm import NumpyLSTM, export_npz
+    from src.text_classifier import build_text_model
+    rng = np.random.default_rng(0)
+    X = rng.integers(1, vocab_len, size=(rows, max_len), dtype=np.int32)
+    # Posts are post-padded with index 0
+    for row, length in zip(X, rng.integers(1, max_len + 1, size=rows)):
+        row[length:] = 0
+    worst = 0.0
+    for out_units in (1, 3):
+        model = build_text_model(vocab_len, max_len, emb_dim, out_units)
+        # Default embeddings are uniform in +-0.05; spread them like real word vectors
+        embedding = next(layer for layer in model.layers if layer.__class__.__name__ == 'Embedding')
+        embedding.set_weights([rng.normal(0, 1, size=(vocab_len, emb_dim)).astype(np.float32)])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'model.npz'
+            export_npz(model, path)
+            got = NumpyLSTM.load(path).predict(X)
+        expected = model.predict(X, verbose=0)
+        np.testing.assert_allclose(got, expected, rtol=0, atol=atol,
+                                   err_msg=f'NumPy backend differs from Keras ({out_units} output units)')
+        worst = max(worst, float(np.abs(got - expected).max()))
+    return worst
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--atol', type=float, default=1e-4, help='max allowed absolute score difference')
+    parser.add_argument('--synthetic', action='store_true', help='check random models instead of the trained one')
+    parser.add_argument('--measure', choices=['keras', 'numpy'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        measure(args.measure)
+        return
+    if args.synthetic:
+        try:
+            diff = synthetic_parity(args.atol)
+        except AssertionError as e:
+            sys.exit(f'FAIL: {e}')
+        print(f'synthetic parity: max |keras - numpy| = {diff:.2e} (atol {args.atol:g})')
+        return
+
+    from src.text_classifier import load_inference_model, get_vocab
+    word_to_index, max_len = get_vocab()
+    X = sample_inputs(word_to_index, max_len)
+    expected = load_inference_model('keras').predict(X, verbose=0)
+    got = load_inference_model('numpy').predict(X)
+    diff = float(np.abs(expected - got).max())
+    print(f'parity over {len(X)} rows: max |keras - numpy| = {diff:.2e} (atol {args.atol:g})')
+
+    print(f'\n{"backend":<8} {"load s":>8} {"RSS MB":>8}' + ''.join(f' {"batch " + str(n) + " ms":>12}' for n in BATCH_SIZES))
+    for backend in ('keras', 'numpy'):
+        out = subprocess.run([sys.executable, __file__, '--measure', backend], cwd=root,
+                             capture_output=True, text=True, check=True).stdout
+        stats = json.loads(out.strip().splitlines()[-1])
+        print(f'{backend:<8} {stats["load_s"]:>8.2f} {stats["rss_mb"]:>8.0f}'
+              + ''.join(f' {stats["latency_ms"][str(n)]:>12.2f}' for n in BATCH_SIZES))
+
+    if diff > args.atol:
+        sys.exit(f'FAIL: NumPy backend differs from Keras by {diff:.2e}')
+
+if __name__ == '__main__':
+    main()
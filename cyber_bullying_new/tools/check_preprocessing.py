@@ -0,0 +1,175 @@
+"""Check label_image's OpenCV preprocessing against the training graph.
+
+Run from project root:
+    python tools/check_preprocessing.py [--dir static/test] [--limit 100] [--batch-size 32]
+                                        [--max-mean-diff 0.01] [--no-model] [--synthetic]
+
+For every image the reference is what the model was trained on: the graph
+built by retrain.py's add_jpeg_decoding (decode_jpeg, cast, expand_dims,
+resize_bilinear without half-pixel centres, normalize with mean 128 /
+std 128), which read_tensor_from_image_file also used to build and run in
+a new tf.Session per image. Reported:
+- mean and max absolute difference from preprocess_image(), in normalized
+  units (1/128 per 8-bit level). TensorFlow decodes JPEG with the fast
+  integer DCT and OpenCV with the accurate one, so the same comparison is
+  also made against TF decoding with dct_method='INTEGER_ACCURATE';
+- unless --no-model, the largest change in a class probability and how
+  many top labels differ, with both inputs run through retrained_graph.pb;
+- per-image time: the old graph-and-session path, TF ops reused in one
+  session, preprocess_image(), and preprocess_batch() into a reused buffer.
+Exits with status 1 if the mean difference exceeds --max-mean-diff.
+
+--synthetic (for CI, where the test images and model may be missing)
+checks generated images instead: random gradients with noise, encoded as
+PNG and as JPEG in several sizes, compared without the model. PNG decodes
+identically and the resize reproduces the training graph's sampling, so
+the PNGs must also stay within --max-png-diff (float rounding) at every
+pixel.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+import label_image
+import retrain
+from label_image import tf
+
+SIZE = 299
+MEAN = 128
+STD = 128
+EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp')
+
+def tf_graph(dct_method=''):
+    """Encoded bytes placeholder -> (1, SIZE, SIZE, 3) normalized tensor, as retrain.py trained on."""
+    if not dct_method:
+        return retrain.add_jpeg_decoding(SIZE, SIZE, 3, MEAN, STD)
+    # The same ops as add_jpeg_decoding, with a different JPEG DCT
+    image_bytes = tf.placeholder(tf.string)
+    image = tf.image.decode_jpeg(image_bytes, channels=3, dct_method=dct_method)
+    resized = tf.image.resize_bilinear(tf.expand_dims(tf.cast(image, tf.float32), 0), [SIZE, SIZE])
+    return image_bytes, tf.multiply(tf.subtract(resized, MEAN), 1.0 / STD)
+
+def synthetic_images():
+    """(names, encoded bytes) of generated test images."""
+    import cv2
+    rng = np.random.default_rng(0)
+    names, images = [], []
+    for i, (height, width) in enumerate([(480, 640), (299, 299), (1024, 768), (120, 200)]):
+        y, x = np.mgrid[0:height, 0:width]
+        image = np.stack([x * 255.0 / width, y * 255.0 / height, (x + y) * 127.0 / (width + height)], axis=-1)
+        image = np.clip(image + rng.normal(0, 20, image.shape), 0, 255).astype(np.uint8)
+        for ext in ('.png', '.jpg'):
+            names.append(Path(f'synthetic_{i}_{width}x{height}{ext}'))
+            images.append(cv2.imencode(ext, image)[1].tobytes())
+    return names, images
+
+def old_path(data):
+    """Build the graph and open a session for one image, as read_tensor_from_image_file did."""
+    with tf.Graph().as_default():
+        image_bytes, normalized = tf_graph()
+        with tf.Session() as sess:
+            return sess.run(normalized, {image_bytes: data})[0]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dir', default=str(root / 'static' / 'test'))
+    parser.add_argument('--limit', type=int, default=100, help='only the first N images (0 = all)')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--max-mean-diff', type=float, default=0.01, help='allowed mean absolute difference')
+    parser.add_argument('--no-model', action='store_true', help='skip comparing model outputs')
+    parser.add_argument('--synthetic', action='store_true', help='check generated images instead of --dir, no model')
+    parser.add_argument('--max-png-diff', type=float, default=1e-5,
+                        help='with --synthetic, allowed per-pixel difference on PNGs')
+    args = parser.parse_args()
+
+    if args.synthetic:
+        paths, images = synthetic_images()
+        args.dir = 'generated images'
+        args.no_model = True
+    else:
+        paths = sorted(p for p in Path(args.dir).iterdir() if p.suffix.lower() in EXTENSIONS)
+        if args.limit:
+            paths = paths[:args.limit]
+        images = [p.read_bytes() for p in paths]
+
+    graph = tf.Graph()
+    with graph.as_default():
+        default_in, default_out = tf_graph()
+        accurate_in, accurate_out = tf_graph('INTEGER_ACCURATE')
+    sess = tf.Session(graph=graph)
+
+    reference, ours = [], []
+    diffs, accurate_diffs = [], []
+    timings = {'old graph + session': 0.0, 'TF ops, one session': 0.0, 'preprocess_image': 0.0}
+    for path, data in zip(paths, images):
+        t0 = time.perf_counter()
+        old_path(data)
+        t1 = time.perf_counter()
+        ref = sess.run(default_out, {default_in: data})[0]
+        t2 = time.perf_counter()
+        new = label_image.preprocess_image(data, None, SIZE, SIZE, MEAN, STD)
+        t3 = time.perf_counter()
+        timings['old graph + session'] += t1 - t0
+        timings['TF ops, one session'] += t2 - t1
+        timings['preprocess_image'] += t3 - t2
+        reference.append(ref)
+        ours.append(new)
+        diffs.append(np.abs(ref - new))
+        if path.suffix.lower() in ('.jpg', '.jpeg'):
+            accurate_diffs.append(np.abs(sess.run(accurate_out, {accurate_in: data})[0] - new))
+
+    buffer = np.empty((args.batch_size, SIZE, SIZE, 3), dtype=np.float32)
+    t0 = time.perf_counter()
+    for start in range(0, len(images), args.batch_size):
+        chunk = images[start:start + args.batch_size]
+        label_image.preprocess_batch(chunk, buffer[:len(chunk)], SIZE, SIZE, MEAN, STD)
+    timings['preprocess_batch'] = time.perf_counter() - t0
+
+    mean_diff = float(np.mean([d.mean() for d in diffs]))
+    print(f'{len(images)} images from {args.dir}')
+    print(f'vs training graph: mean abs diff {mean_diff:.5f}, max {max(d.max() for d in diffs):.4f}')
+    if accurate_diffs:
+        print(f'vs TF with accurate JPEG DCT ({len(accurate_diffs)} JPEGs): mean abs diff '
+              f'{np.mean([d.mean() for d in accurate_diffs]):.5f}, max {max(d.max() for d in accurate_diffs):.4f}')
+
+    if not args.no_model:
+        try:
+            classifier = label_image.ImageClassifier(str(root / label_image.MODEL_FILE), str(root / label_image.LABEL_FILE))
+        except Exception as e:
+            print(f'model comparison skipped: {e}')
+        else:
+            changed = flipped = 0.0
+            for start in range(0, len(images), args.batch_size):
+                old = classifier.classify_batch(reference[start:start + args.batch_size])
+                new = classifier.classify_batch(ours[start:start + args.batch_size])
+                for a, b in zip(old, new):
+                    changed = max(changed, max(abs(a[k] - b[k]) for k in a))
+                    flipped += max(a, key=a.get) != max(b, key=b.get)
+            print(f'model output: max probability change {changed:.4f}, top label differs for {int(flipped)} images')
+
+    print(f'\n{"path":<24}{"ms/image":>10}')
+    for name, seconds in timings.items():
+        print(f'{name:<24}{seconds / len(images) * 1e3:>10.2f}')
+
+    failed = False
+    if mean_diff > args.max_mean_diff:
+        print(f'FAIL: mean difference {mean_diff:.5f} > {args.max_mean_diff}')
+        failed = True
+    if args.synthetic:
+        png_diff = max(d.max() for p, d in zip(paths, diffs) if p.suffix == '.png')
+        print(f'PNG max abs diff {png_diff:.2e}')
+        if png_diff > args.max_png_diff:
+            print(f'FAIL: PNG pixel difference {png_diff:.2e} > {args.max_png_diff:.2e}')
+            failed = True
+    if failed:
+        sys.exit(1)
+    print('OK')
+
+if __name__ == '__main__':
+    main()
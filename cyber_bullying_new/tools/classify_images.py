@@ -0,0 +1,132 @@
+"""Classify every image in one or more folders as fake or original.
+
+Run from project root:
+    python tools/classify_images.py [static/test static/images ...] [--out classified_images.jsonl]
+                                    [--batch-size 32] [--threads 4] [--restart]
+
+Images are read and preprocessed on --threads threads and classified
+--batch-size at a time, one model run per batch (label_image.ImageClassifier).
+Each result (path, top label, probability per label, or the error for an
+unreadable image) is appended to --out as soon as its batch is done: JSON
+lines, or CSV when --out ends in .csv.
+
+Paths already in --out are skipped, so an interrupted run picks up where it
+stopped; a partly written last line is dropped first. --restart starts the
+file over.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+import label_image
+
+EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp')
+
+def find_images(directories):
+    paths = []
+    for directory in directories:
+        paths.extend(str(p) for p in sorted(Path(directory).rglob('*'))
+                     if p.is_file() and p.suffix.lower() in EXTENSIONS)
+    return paths
+
+def drop_partial_line(path):
+    """Truncate `path` after its last newline (the tail of an interrupted write)."""
+    with open(path, 'rb+') as f:
+        data = f.read()
+        end = data.rfind(b'\n') + 1
+        if end < len(data):
+            f.truncate(end)
+
+def done_paths(path, is_csv):
+    if not os.path.exists(path):
+        return set()
+    drop_partial_line(path)
+    with open(path, newline='', encoding='utf-8') as f:
+        if is_csv:
+            return {row['path'] for row in csv.DictReader(f)}
+        return {json.loads(line)['path'] for line in f if line.strip()}
+
+class JsonlSink:
+    def __init__(self, path, labels, append):
+        self.file = open(path, 'a' if append else 'w', encoding='utf-8')
+
+    def write(self, path, probabilities, error):
+        row = {'path': path, 'label': max(probabilities, key=probabilities.get) if probabilities else None,
+               'probabilities': probabilities, 'error': error}
+        self.file.write(json.dumps(row) + '\n')
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+class CsvSink:
+    def __init__(self, path, labels, append):
+        self.labels = labels
+        write_header = not append or os.path.getsize(path) == 0
+        self.file = open(path, 'a' if append else 'w', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.file, fieldnames=['path', 'label'] + labels + ['error'])
+        if write_header:
+            self.writer.writeheader()
+
+    def write(self, path, probabilities, error):
+        row = {'path': path, 'error': error or ''}
+        if probabilities:
+            row['label'] = max(probabilities, key=probabilities.get)
+            row.update(probabilities)
+        self.writer.writerow(row)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+def classify_all(directories, out, batch_size, threads, restart):
+    is_csv = out.lower().endswith('.csv')
+    if restart and os.path.exists(out):
+        os.remove(out)
+    done = done_paths(out, is_csv)
+    paths = [p for p in find_images(directories) if p not in done]
+    print(f'{len(paths)} images to classify ({len(done)} already in {out})')
+    if not paths:
+        return
+
+    classifier = label_image.ImageClassifier(str(root / label_image.MODEL_FILE), str(root / label_image.LABEL_FILE))
+    sink = (CsvSink if is_csv else JsonlSink)(out, classifier.labels, append=bool(done))
+    start = time.perf_counter()
+    count = errors = 0
+    try:
+        for path, probabilities, error in classifier.classify_files(paths, batch_size, threads):
+            sink.write(path, probabilities, error)
+            count += 1
+            errors += error is not None
+            if count % batch_size == 0 or count == len(paths):
+                sink.flush()
+                elapsed = time.perf_counter() - start
+                print(f'{count}/{len(paths)} images, {count / elapsed:.1f} images/s', flush=True)
+    finally:
+        sink.close()
+        classifier.close()
+    print(f'done: {count} images ({errors} unreadable) in {time.perf_counter() - start:.1f}s -> {out}')
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('dirs', nargs='*', default=[str(root / 'static' / 'test')], help='folders to classify (searched recursively)')
+    parser.add_argument('--out', default=str(root / 'classified_images.jsonl'), help='.jsonl or .csv results file')
+    parser.add_argument('--batch-size', type=int, default=32, help='images per model run')
+    parser.add_argument('--threads', type=int, default=4, help='threads reading and preprocessing images')
+    parser.add_argument('--restart', action='store_true', help='overwrite --out instead of resuming')
+    args = parser.parse_args()
+    classify_all(args.dirs, args.out, max(1, args.batch_size), max(1, args.threads), args.restart)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""Move a retrain.py bottleneck cache from text files into the binary store.
+
+Run from project root:
+    python tools/convert_bottlenecks.py [--bottleneck_dir /tmp/bottleneck] [--architecture inception_v3]
+
+retrain.py used to write one comma-separated text file per image
+(<label dir>/<image>_<architecture>.txt). It now keeps all bottlenecks in
+bottlenecks_<architecture>.npy with a JSON index next to it. This copies
+every valid text file into that store so the next training run needs
+neither the old files nor the Inception graph. Images already in the store
+are skipped; the text files are left in place.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+import retrain
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--bottleneck_dir', default='/tmp/bottleneck', help='folder given to retrain.py')
+    parser.add_argument('--architecture', default='inception_v3', help='architecture the bottlenecks were made with')
+    args = parser.parse_args()
+
+    if not Path(args.bottleneck_dir).is_dir():
+        parser.error(f'{args.bottleneck_dir} is not a folder')
+    start = time.perf_counter()
+    added = retrain.convert_text_bottlenecks(args.bottleneck_dir, args.architecture)
+    store = retrain.get_bottleneck_store(args.bottleneck_dir, args.architecture)
+    print(f'{added} bottlenecks converted in {time.perf_counter() - start:.1f}s; '
+          f'{len(store)} in {store.path}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+"""Export the Keras text model to src/LSTM.npz for the NumPy backend.
+
+Run from project root (needs TensorFlow, once):
+    python tools/export_numpy_model.py [--out src/LSTM.npz]
+
+Serve it by setting TEXT_MODEL_BACKEND=numpy.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+from src.text_classifier import load_text_model, MODEL_NPZ
+from src.numpy_lstm import export_npz
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--out', default=str(MODEL_NPZ), help='output .npz path')
+    args = parser.parse_args()
+    model = load_text_model()
+    export_npz(model, args.out)
+    print('Exported', len(model.layers), 'layers to', args.out)
+
+if __name__ == '__main__':
+    main()
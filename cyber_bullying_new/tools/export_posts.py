@@ -1,47 +1,308 @@
+"""Export every user's posts with their cleaned text and text model score.
+
+Run from project root:
+    python tools/export_posts.py [--batch-size 256] [--workers 4] [--out PATH] [--incremental]
+                                 [--format csv|parquet|arrow] [--index-matrix posts_X.npy]
+
+Posts are read from src/main.db in chunks of --batch-size, cleaned in a pool
+of --workers processes (0 cleans in-process), scored with one batched
+predict per chunk and written to the CSV as soon as the chunk is done, so
+memory use does not grow with the number of posts.
+
+Posts whose stored `nature` was produced by the current model (see the
+post_models table written by src/home.py) reuse that score; only the rest
+are predicted. "Current model" means the same artifact, backend,
+quantization and length buckets (text_classifier.inference_fingerprint),
+so e.g. a TFLite export never mixes in scores stored by the Keras model. With --incremental the CSV is appended to, and a per-user
+high-water mark of exported post ids is kept next to it in
+<out>.state.json, so each run only touches posts added since the last one.
+
+--format parquet / arrow (needs pyarrow) writes typed columns: strings,
+score as float32 and timestamp as timestamp[s]; each chunk becomes one
+Parquet row group or Arrow record batch. --index-matrix also saves the
+encoded int32 (posts, max_len) model input as a .npy aligned with the
+exported rows, which np.load(..., mmap_mode='r') maps without re-tokenizing.
+tools/bench_export_formats.py compares the formats.
+"""
+import argparse
 import csv
-from pathlib import Path
+import json
+import multiprocessing
+import os
+import shutil
 import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
 
 root = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(root))
 
 from cs50 import SQL
 from src import reddy_tech
-from src.text_classifier import load_text_model, get_vocab
+from src.text_classifier import load_inference_model, get_vocab, inference_fingerprint
+from src.caching import ScoreCache
+import config as app_config
 
 DB_PATH = root / 'src' / 'main.db'
-OUT_CSV = root / 'exported_posts.csv'
+FORMATS = ('csv', 'parquet', 'arrow')
+FIELDS = ['username', 'text', 'cleaned', 'score', 'timestamp']
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
 
-def export_all():
-    db = SQL(f"sqlite:///{DB_PATH}")
-    rows = []
-    # list tables (user tables) could be many; query users table for usernames
-    users = db.execute('SELECT username FROM users')
-    model = load_text_model()
-    word_to_index, max_len = get_vocab()
-    for u in users:
+def default_out(fmt):
+    return root / f'exported_posts.{fmt}'
+
+class CsvSink:
+    def __init__(self, path, append=False):
+        self.file = open(path, 'a' if append else 'w', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.file, fieldnames=FIELDS)
+        if not append:
+            self.writer.writeheader()
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+class ArrowSink:
+    """Typed columns written as Parquet row groups or Arrow IPC record batches."""
+
+    def __init__(self, path, fmt):
+        try:
+            import pyarrow as pa
+            import pyarrow.compute as pc
+        except ImportError:
+            raise SystemExit('pyarrow is required for --format parquet/arrow (pip install pyarrow)')
+        self.pa, self.pc = pa, pc
+        self.schema = pa.schema([
+            ('username', pa.string()),
+            ('text', pa.string()),
+            ('cleaned', pa.string()),
+            ('score', pa.float32()),
+            ('timestamp', pa.timestamp('s')),
+        ])
+        if fmt == 'parquet':
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(str(path), self.schema)
+        else:
+            self.writer = pa.ipc.new_file(str(path), self.schema)
+
+    def write(self, rows):
+        pa = self.pa
+        timestamps = pa.array([None if r['timestamp'] is None else str(r['timestamp']) for r in rows], pa.string())
+        batch = pa.record_batch([
+            pa.array([r['username'] for r in rows], pa.string()),
+            pa.array([r['text'] for r in rows], pa.string()),
+            pa.array([r['cleaned'] for r in rows], pa.string()),
+            # Failed predictions are '' in the CSV and null here
+            pa.array([None if r['score'] == '' else r['score'] for r in rows], pa.float32()),
+            self.pc.strptime(timestamps, format=TIMESTAMP_FORMAT, unit='s', error_is_null=True),
+        ], schema=self.schema)
+        self.writer.write_batch(batch)
+
+    def close(self):
+        self.writer.close()
+
+class IndexMatrixSink:
+    """Encoded int32 rows streamed to <path>.part, wrapped as a .npy on close.
+
+    .npy rather than .npz because only plain .npy files can be memory-mapped.
+    """
+
+    def __init__(self, path, max_len):
+        self.path = str(path)
+        self.max_len = max_len
+        self.rows = 0
+        self.raw = open(f'{self.path}.part', 'wb')
+
+    def write(self, X):
+        X.astype('<i4', copy=False).tofile(self.raw)
+        self.rows += len(X)
+
+    def close(self):
+        self.raw.close()
+        header = {'descr': '<i4', 'fortran_order': False, 'shape': (self.rows, self.max_len)}
+        with open(self.path, 'wb') as out, open(f'{self.path}.part', 'rb') as raw:
+            np.lib.format.write_array_header_1_0(out, header)
+            shutil.copyfileobj(raw, out)
+        os.remove(f'{self.path}.part')
+
+def iter_chunks(db, batch_size, watermarks=None):
+    """Yield lists of post rows (with 'username' set), at most batch_size each.
+
+    `watermarks` maps usernames to the last post id already exported; only
+    posts after it are read.
+    """
+    watermarks = watermarks or {}
+    chunk = []
+    for u in db.execute('SELECT DISTINCT username FROM users'):
         uname = u['username']
+        last_id = watermarks.get(uname, 0)
+        while True:
+            # Keyset pagination on id so each query only touches one page
+            try:
+                page = db.execute('SELECT id, text, timestamp, nature FROM :tablename WHERE id > :after ORDER BY id LIMIT :n',
+                                  tablename=uname, after=last_id, n=batch_size)
+            except Exception:
+                break
+            for p in page:
+                p['username'] = uname
+                chunk.append(p)
+                if len(chunk) == batch_size:
+                    yield chunk
+                    chunk = []
+            if len(page) < batch_size:
+                break
+            last_id = page[-1]['id']
+    if chunk:
+        yield chunk
+
+def stored_scores(db, chunk, fingerprint):
+    """Stored `nature` for each post scored by the model with `fingerprint`, else None.
+
+    `fingerprint` is an inference_fingerprint(); rows recorded under any other
+    model identity (or the older weights-only fingerprint) are not reused.
+    """
+    matching = set()
+    by_user = {}
+    for p in chunk:
+        by_user.setdefault(p['username'], []).append(p['id'])
+    for uname, ids in by_user.items():
         try:
-            posts = db.execute('SELECT * FROM :tablename', tablename=uname)
+            rows = db.execute('SELECT post_id FROM post_models WHERE username = :username AND fingerprint = :fingerprint AND post_id BETWEEN :lo AND :hi',
+                              username=uname, fingerprint=fingerprint, lo=min(ids), hi=max(ids))
         except Exception:
-            continue
-        for p in posts:
-            text = p.get('text','')
-            cleaned = reddy_tech.clean_text(text)
-            X = reddy_tech.sentences_to_indices([cleaned], word_to_index, max_len)
-            score = None
+            # No post_models table yet: nothing can be reused
+            return [None] * len(chunk)
+        matching.update((uname, r['post_id']) for r in rows)
+    scores = []
+    for p in chunk:
+        score = None
+        if (p['username'], p['id']) in matching:
             try:
-                score = float(model.predict(X)[0][0])
-            except Exception:
-                score = ''
-            rows.append({'username': uname, 'text': text, 'cleaned': cleaned, 'score': score, 'timestamp': p.get('timestamp','')})
+                score = float(p['nature'])
+            except (TypeError, ValueError):
+                pass
+        scores.append(score)
+    return scores
+
+def load_state(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'users': {}}
+
+def save_state(path, state):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+def clean_chunk(texts):
+    return reddy_tech.clean_texts(texts)
+
+def cleaned_chunks(chunks, executor, depth):
+    """Yield (chunk, cleaned texts), keeping at most `depth` chunks in flight."""
+    if executor is None:
+        for chunk in chunks:
+            yield chunk, clean_chunk([p['text'] or '' for p in chunk])
+        return
+    pending = deque()
+    for chunk in chunks:
+        pending.append((chunk, executor.submit(clean_chunk, [p['text'] or '' for p in chunk])))
+        if len(pending) >= depth:
+            chunk, future = pending.popleft()
+            yield chunk, future.result()
+    while pending:
+        chunk, future = pending.popleft()
+        yield chunk, future.result()
+
+def score_chunk(model, cache, cleaned, word_to_index, max_len, scores):
+    """Fill the None entries of `scores` from the cache, then one predict for the misses."""
+    scores = [s if s is not None else cache.get_score(c) for c, s in zip(cleaned, scores)]
+    missing = [i for i, s in enumerate(scores) if s is None]
+    if missing:
+        X = reddy_tech.encode_sentences([cleaned[i] for i in missing], word_to_index, max_len)
+        try:
+            predicted = model.predict(X, verbose=0)[:, 0]
+        except Exception as e:
+            print('Prediction failed for', len(missing), 'posts:', e)
+            predicted = [''] * len(missing)
+        for i, score in zip(missing, predicted):
+            if score != '':
+                score = float(score)
+                cache.put_score(cleaned[i], score)
+            scores[i] = score
+    return scores
+
+def export_all(out_path=None, batch_size=256, workers=0, incremental=False, fmt='csv', index_path=None):
+    # Parquet/Arrow files and the index matrix are rewritten, not appended to,
+    # so an incremental run would drop every previously exported row
+    if incremental and (fmt != 'csv' or index_path):
+        raise ValueError('incremental export only supports CSV output without an index matrix')
+    db = SQL(f"sqlite:///{DB_PATH}")
+    model = load_inference_model(app_config.TEXT_MODEL_BACKEND, app_config.TEXT_LENGTH_BUCKETS)
+    word_to_index, max_len = get_vocab()
+    fingerprint = inference_fingerprint(app_config.TEXT_MODEL_BACKEND, app_config.TEXT_LENGTH_BUCKETS)
+    cache = ScoreCache(fingerprint, memory_size=app_config.SCORE_CACHE_SIZE,
+                       db_path=app_config.SCORE_CACHE_DB, max_entries=app_config.SCORE_CACHE_DB_ENTRIES)
+    out_path = str(out_path or default_out(fmt))
+    state_path = f'{out_path}.state.json'
+    # Without an existing output file there is nothing to append to
+    incremental = incremental and os.path.exists(out_path)
+    state = load_state(state_path) if incremental else {'users': {}}
+    sink = CsvSink(out_path, append=incremental) if fmt == 'csv' else ArrowSink(out_path, fmt)
+    index_sink = IndexMatrixSink(index_path, max_len) if index_path else None
+    # Spawned, not forked: this process already runs TensorFlow threads and holds SQLite connections
+    executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) if workers > 0 else None
+    total = reused = 0
+    start = time.perf_counter()
+    try:
+        chunks = iter_chunks(db, batch_size, dict(state['users']))
+        for chunk, cleaned in cleaned_chunks(chunks, executor, max(2, 2 * workers)):
+            stored = stored_scores(db, chunk, fingerprint)
+            reused += sum(s is not None for s in stored)
+            scores = score_chunk(model, cache, cleaned, word_to_index, max_len, stored)
+            sink.write([{'username': p['username'], 'text': p['text'], 'cleaned': c,
+                         'score': s, 'timestamp': p['timestamp']}
+                        for p, c, s in zip(chunk, cleaned, scores)])
+            if index_sink is not None:
+                index_sink.write(reddy_tech.encode_sentences(cleaned, word_to_index, max_len))
+            total += len(chunk)
+            if fmt == 'csv':
+                # Only advance the watermark once the rows are on disk
+                for p in chunk:
+                    state['users'][p['username']] = max(p['id'], state['users'].get(p['username'], 0))
+                save_state(state_path, state)
+    finally:
+        sink.close()
+        if index_sink is not None:
+            index_sink.close()
+        if executor is not None:
+            executor.shutdown()
+    elapsed = time.perf_counter() - start
+    print(f'Exported {total} rows to {out_path} in {elapsed:.2f}s ({total / elapsed if elapsed else 0:.0f} rows/sec)')
+    print(f'Reused {reused} stored scores from model {fingerprint}')
+    print('Score cache:', cache.stats())
 
-    with open(OUT_CSV, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=['username','text','cleaned','score','timestamp'])
-        writer.writeheader()
-        for r in rows:
-            writer.writerow(r)
-    print('Exported', len(rows), 'rows to', OUT_CSV)
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--out', help='output file (default: exported_posts.<format> in the project root)')
+    parser.add_argument('--format', default='csv', choices=FORMATS)
+    parser.add_argument('--index-matrix', help='also write the encoded int32 model input to this .npy file')
+    parser.add_argument('--batch-size', type=int, default=256, help='posts read, cleaned and scored together')
+    parser.add_argument('--workers', type=int, default=0, help='processes for clean_text (0 = in-process)')
+    parser.add_argument('--incremental', action='store_true', help='append only posts added since the last run')
+    args = parser.parse_args()
+    if args.incremental and (args.format != 'csv' or args.index_matrix):
+        parser.error('--incremental only supports CSV output without --index-matrix')
+    export_all(args.out, max(1, args.batch_size), max(0, args.workers), args.incremental, args.format, args.index_matrix)
 
 if __name__ == '__main__':
-    export_all()
+    main()
@@ -0,0 +1,80 @@
+"""Convert the Keras text model to TFLite and report the score drift.
+
+Run from project root (needs TensorFlow):
+    python tools/export_tflite.py [--quantize] [--batch-size 1] [--out src/LSTM.tflite] [--report drift.json]
+
+--quantize applies dynamic-range int8 quantization to the weights. The
+converted LSTM has a fixed batch dimension; pick --batch-size to match the
+typical batch (TEXT_BATCH_MAX_SIZE for the web app, 1 for single posts).
+
+The drift report compares Keras and TFLite scores on the held-out posts in
+exported_posts.csv: max/mean absolute difference and how many posts would
+land on the other side of the 0.4 threshold home.py uses. Serve the
+artifact with TEXT_MODEL_BACKEND=tflite.
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+from src import reddy_tech
+from src.text_classifier import load_text_model, get_vocab, MODEL_TFLITE
+from src.tflite_model import export_tflite, TFLiteTextModel
+
+THRESHOLD = 0.4
+
+def per_row_ms(model, X, runs=5):
+    model.predict(X[:1], verbose=0)
+    start = time.perf_counter()
+    for _ in range(runs):
+        for i in range(len(X)):
+            model.predict(X[i:i + 1], verbose=0)
+    return (time.perf_counter() - start) / (runs * len(X)) * 1e3
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--out', default=str(MODEL_TFLITE), help='output .tflite path')
+    parser.add_argument('--quantize', action='store_true', help='dynamic-range int8 weight quantization')
+    parser.add_argument('--batch-size', type=int, default=1, help='fixed batch size of the artifact')
+    parser.add_argument('--sample', default=str(root / 'exported_posts.csv'), help='CSV with a cleaned column')
+    parser.add_argument('--report', help='also write the drift report as JSON')
+    args = parser.parse_args()
+
+    model = load_text_model()
+    size = export_tflite(model, args.out, quantize=args.quantize, batch_size=args.batch_size)
+    print(f'Wrote {args.out} ({size / 1024:.0f} KiB, batch {args.batch_size}, quantized={args.quantize})')
+
+    word_to_index, max_len = get_vocab()
+    with open(args.sample, newline='', encoding='utf-8') as f:
+        cleaned = [row['cleaned'] for row in csv.DictReader(f)]
+    X = reddy_tech.encode_sentences(cleaned, word_to_index, max_len)
+    lite = TFLiteTextModel(args.out)
+    expected = model.predict(X, verbose=0)[:, 0]
+    got = lite.predict(X)[:, 0]
+    diff = np.abs(expected - got)
+    report = {
+        'artifact': args.out,
+        'quantized': args.quantize,
+        'size_bytes': size,
+        'samples': len(X),
+        'max_abs_diff': float(diff.max()) if len(diff) else 0.0,
+        'mean_abs_diff': float(diff.mean()) if len(diff) else 0.0,
+        'decision_flips': int(((expected < THRESHOLD) != (got < THRESHOLD)).sum()),
+        'keras_ms_per_post': per_row_ms(model, X),
+        'tflite_ms_per_post': per_row_ms(lite, X),
+    }
+    for key, value in report.items():
+        print(f'{key:<20} {value}')
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
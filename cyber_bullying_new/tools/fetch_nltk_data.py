@@ -0,0 +1,28 @@
+"""Download the NLTK resources clean_text needs into the vendored data dir.
+
+Run once from project root (needs network):
+    python tools/fetch_nltk_data.py [--dir nltk_data]
+
+Afterwards the app can start with NLTK_OFFLINE=1 and never try to download.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+import nltk
+import config as app_config
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dir', default=app_config.NLTK_DATA_DIR, help='target NLTK data directory')
+    args = parser.parse_args()
+    failed = [name for name, _ in app_config.NLTK_RESOURCES if not nltk.download(name, download_dir=args.dir)]
+    if failed:
+        sys.exit('Failed to download: ' + ', '.join(failed))
+    print('NLTK data ready in', args.dir)
+
+if __name__ == '__main__':
+    main()
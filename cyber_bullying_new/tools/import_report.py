@@ -0,0 +1,51 @@
+"""Report how much each subsystem adds to app startup.
+
+Run from project root:
+    python tools/import_report.py [--module app] [--top 15]
+
+Imports the module in a fresh `python -X importtime` interpreter and sums
+the self time of every imported module under its top-level package
+(tensorflow, keras, cv2, nltk, src, ...), so heavy imports that crept back
+into startup show up at the top.
+"""
+import argparse
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+root = Path(__file__).resolve().parents[1]
+
+LINE_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--module', default='app', help='module to import (default: app)')
+    parser.add_argument('--top', type=int, default=15, help='number of packages to list')
+    args = parser.parse_args()
+
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {args.module}'],
+                          cwd=root, capture_output=True, text=True)
+    per_package = defaultdict(int)
+    modules = defaultdict(int)
+    for line in proc.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if not match:
+            continue
+        self_us, name = int(match.group(1)), match.group(4)
+        package = name.split('.')[0]
+        per_package[package] += self_us
+        modules[package] += 1
+    if proc.returncode != 0:
+        print(proc.stderr[-2000:])
+        sys.exit(f'import {args.module} failed')
+
+    total = sum(per_package.values())
+    print(f'import {args.module}: {total / 1e6:.2f} s across {sum(modules.values())} modules\n')
+    print(f'{"package":<28} {"ms":>9} {"share":>7} {"modules":>8}')
+    for package, us in sorted(per_package.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f'{package:<28} {us / 1e3:>9.1f} {us / total:>7.1%} {modules[package]:>8}')
+
+if __name__ == '__main__':
+    main()